@@ -18,6 +18,8 @@ def get_config():
     autoscale_config.cluster.UPDATE_CONCURRENCY_PERIOD_MILLI = 1000
     # * Controls the slop of the burst.
     autoscale_config.cluster.NETWORK_DELAY_MILLI = 100
+    # * Max. number of released requests reaching the cluster per millisecond.
+    autoscale_config.cluster.INGRESS_REQUESTS_PER_MILLI = 10
     # * Interval of dispatching requested in the central queue.
     autoscale_config.cluster.DISPATCH_PERIOD_MILLI = 5000
     # * The time the control plane takes to discover the status change of an instance
@@ -46,6 +48,8 @@ def get_config():
     autoscale_config.node.INSTANCE_GRACE_PERIOD_SEC = 30 
     # * On average, 20% of the CPU time is consumed by the underling infrastructure.
     autoscale_config.node.INFRA_CPU_OVERHEAD_RATIO = 0.5
+    # * Cross-check the incrementally maintained utilization counters against a full recount (slow).
+    autoscale_config.node.CHECK_UTILIZATION_COUNTERS = False
 
     
     autoscale_config.harvestvm = config_dict.ConfigDict()
@@ -66,6 +70,8 @@ def get_config():
 
     autoscale_config.autoscaler = config_dict.ConfigDict()
     autoscale_config.autoscaler.ALWAYS_PANIC = True
+    # * Evaluate all functions at once with NumPy (cf. `VectorizedAutoscaler`).
+    autoscale_config.autoscaler.VECTORIZED = False
     # * Due to communication overhead, the metrics are not always reflective of the 
     # * real-time scales of the functions -> x10 for the window size.
     autoscale_config.autoscaler.PANIC_WINDOW_SEC = 6 * 10
@@ -75,7 +81,11 @@ def get_config():
     autoscale_config.autoscaler.PANIC_THRESHOLD_PCT = 200
     
     autoscale_config.policy = config_dict.ConfigDict()
-    autoscale_config.policy.LOAD_BALANCE = 'first_available' # 'least_loaded'
+    autoscale_config.policy.LOAD_BALANCE = 'first_available' # 'any_available', 'least_loaded', 'power_of_d', 'jsq_d'
+    # * Number of available instances sampled by 'power_of_d' and 'jsq_d'.
+    autoscale_config.policy.LB_SAMPLE_SIZE = 2
+    # * Picking nodes for new instances (cf. `noserver/policy/placement.py`).
+    autoscale_config.policy.PLACEMENT = 'round_robin' # 'best_fit', 'worst_fit', 'most_allocated', 'survival_aware'
     autoscale_config.policy.DUP_EXECUTION = False
     autoscale_config.policy.DUP_EXECUTION_THRESHOLD = 0.5
     
@@ -18,6 +18,8 @@ def get_config():
     default_config.cluster.UPDATE_CONCURRENCY_PERIOD_MILLI = 1000
     # * Controls the slop of the burst.
     default_config.cluster.NETWORK_DELAY_MILLI = 10
+    # * Max. number of released requests reaching the cluster per millisecond.
+    default_config.cluster.INGRESS_REQUESTS_PER_MILLI = 10
     # * Interval of dispatching requested in the central queue.
     default_config.cluster.DISPATCH_PERIOD_MILLI = 1 # 5000
     # * The time the control plane takes to discover the status change of an instance
@@ -46,6 +48,8 @@ def get_config():
     default_config.node.INSTANCE_GRACE_PERIOD_SEC = 30 
     # * On average, 20% of the CPU time is consumed by the underling infrastructure.
     default_config.node.INFRA_CPU_OVERHEAD_RATIO = 0.0
+    # * Cross-check the incrementally maintained utilization counters against a full recount (slow).
+    default_config.node.CHECK_UTILIZATION_COUNTERS = False
 
     
     default_config.harvestvm = config_dict.ConfigDict()
@@ -66,6 +70,8 @@ def get_config():
 
     default_config.autoscaler = config_dict.ConfigDict()
     default_config.autoscaler.ALWAYS_PANIC = True
+    # * Evaluate all functions at once with NumPy (cf. `VectorizedAutoscaler`).
+    default_config.autoscaler.VECTORIZED = False
     # * Due to communication overhead, the metrics are not always reflective of the 
     # * real-time scales of the functions -> x10 for the window size.
     default_config.autoscaler.PANIC_WINDOW_SEC = 6 * 10
@@ -76,7 +82,11 @@ def get_config():
     
     
     default_config.policy = config_dict.ConfigDict()
-    default_config.policy.LOAD_BALANCE = 'first_available' # 'least_loaded'
+    default_config.policy.LOAD_BALANCE = 'first_available' # 'any_available', 'least_loaded', 'power_of_d', 'jsq_d'
+    # * Number of available instances sampled by 'power_of_d' and 'jsq_d'.
+    default_config.policy.LB_SAMPLE_SIZE = 2
+    # * Picking nodes for new instances (cf. `noserver/policy/placement.py`).
+    default_config.policy.PLACEMENT = 'round_robin' # 'best_fit', 'worst_fit', 'most_allocated', 'survival_aware'
     default_config.policy.DUP_EXECUTION = False
     default_config.policy.DUP_EXECUTION_THRESHOLD = 0.5
     
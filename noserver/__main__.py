@@ -27,7 +27,7 @@ def run_trace_mode():
     num_workers = sim.FLAGS.vm
     num_cores = sim.FLAGS.cores
 
-    clock = sim.Clock()
+    clock = sim.new_clock()
     functions = []
     dags = {}
     # ! DAG name should be part of the function name when there are multiple DAGs.
@@ -60,6 +60,9 @@ def run_trace_mode():
     invocation_idx = 0
     sim.state.rps = sim.FLAGS.rps
 
+    clock.fast_forward(
+        lambda: min(arrival_times[invocation_idx], cluster.next_event_time())
+    )
     while True:
         ts = clock.now()
 
@@ -70,23 +73,22 @@ def run_trace_mode():
             # ! This will lead to cold start on EVERY invocation!!!
             # TODO: Technically, parallel invocations are of the SAME functions!!!
             dag: nx.DiGraph = trace_dags[flow_id]
-            sim.state.add_flow(flow_id, dag)
+            template = sim.state.add_flow(flow_id, dag).template
             # ~ Assume DAGs are single-rooted.
-            roots = [n for n, d in dag.in_degree() if d == 0]
-            assert len(roots) == 1, f"DAG has >1 root!"
-            root_func = roots[0]
+            assert len(template.roots) == 1, f"DAG has >1 root!"
+            root = template.roots[0]
 
             request = Request(
                 flow_id=flow_id,
-                dag_name=dag.nodes[root_func]["dag_name"],
+                dag_name=dag.nodes[template.funcs[root]]["dag_name"],
                 duration=min(
-                    dag.nodes[root_func]["duration_milli"],
+                    template.durations[root],
                     request_config.MAX_DURATION_SEC * 1000,
                 ),
-                memory=dag.nodes[root_func]["memory_mib"],
+                memory=template.memories[root],
                 arrival_time=clock.now(),
                 rps=sim.state.rps,
-                dest=f"{dag.nodes[root_func]['dag_name']}-{root_func}",
+                dest=template.dests[root],
             )
             cluster.ingress_accept(request)
             sim.log.info(
@@ -97,18 +99,21 @@ def run_trace_mode():
             invocation_idx += 1
             if invocation_idx == total_flows:
                 break
-            elif arrival_times[invocation_idx - 1] != arrival_times[invocation_idx]:
+
+            clock.wake(arrival_times[invocation_idx])
+            if arrival_times[invocation_idx - 1] != arrival_times[invocation_idx]:
                 # ! Only increase the clock if the next timestamp is not the same as the current one.
-                clock.inc(1)
+                clock.tick()
         else:
-            clock.inc(1)
+            clock.tick()
 
         cluster.run()
     # > End of load generation loop.
 
+    clock.fast_forward(cluster.next_event_time)
     while not cluster.is_finished():
         cluster.run()
-        clock.inc(1)
+        clock.tick()
 
     cluster.dump()
     return
@@ -137,7 +142,7 @@ def run_benchmark_mode():
     num_workers = 0
     num_cores = 40
 
-    clock = sim.Clock()
+    clock = sim.new_clock()
     functions = []
     # ! DAG name should be part of the function name when there are multiple DAGs.
     for func, attributes in dag.nodes(data=True):
@@ -164,24 +169,26 @@ def run_benchmark_mode():
     invocation_idx = 0
     # TODO: Get rid of this.
     sim.state.rps = sim.FLAGS.rps
-    roots = [n for n, d in dag.in_degree() if d == 0]
 
+    clock.fast_forward(
+        lambda: min(arrival_times[invocation_idx], cluster.next_event_time())
+    )
     while True:
         ts = clock.now()
 
         """Invoking new requests."""
         if ts == arrival_times[invocation_idx]:
             """Constructing flow"""
-            sim.state.add_flow(flow_id, dag)
-            for func in roots:
+            template = sim.state.add_flow(flow_id, dag).template
+            for root in template.roots:
                 request = Request(
                     flow_id=flow_id,
                     dag_name="gen_dag",
                     arrival_time=clock.now(),
                     rps=sim.state.rps,
-                    dest=func,
-                    duration=dag.nodes[func]["duration_milli"],
-                    memory=dag.nodes[func]["memory_mib"],
+                    dest=template.dests[root],
+                    duration=template.durations[root],
+                    memory=template.memories[root],
                 )
                 cluster.ingress_accept(request)
                 sim.log.info(
@@ -193,18 +200,21 @@ def run_benchmark_mode():
             invocation_idx += 1
             if invocation_idx == total_flows:
                 break
-            elif arrival_times[invocation_idx - 1] != arrival_times[invocation_idx]:
+
+            clock.wake(arrival_times[invocation_idx])
+            if arrival_times[invocation_idx - 1] != arrival_times[invocation_idx]:
                 # ! Only increase the clock if the next timestamp is not the same as the current one.
-                clock.inc(1)
+                clock.tick()
         else:
-            clock.inc(1)
+            clock.tick()
 
         cluster.run()
     # > End of load generation loop.
 
+    clock.fast_forward(cluster.next_event_time)
     while not cluster.is_finished():
         cluster.run()
-        clock.inc(1)
+        clock.tick()
 
     cluster.dump()
     return
@@ -222,7 +232,7 @@ def run_dag_mode():
     num_workers = 32
     num_cores = 32
 
-    clock = sim.Clock()
+    clock = sim.new_clock()
     functions = []
     for _, dag in dags.items():
         for func, _ in dag.nodes(data=True):
@@ -249,6 +259,8 @@ def run_dag_mode():
 
     # * Adjust clock to 1ms prior to the first timestamp.
     clock.inc(inv_df.iloc[0]["timestamp"] - 1)
+    clock.wake(inv_df.iloc[0]["timestamp"])
+    clock.fast_forward(lambda: min(record[1]["timestamp"], cluster.next_event_time()))
     while True:
         ts = clock.now()
         if ts == record[1]["timestamp"]:
@@ -261,25 +273,24 @@ def run_dag_mode():
             prev_ts = ts
 
             dag: nx.DiGraph = dags[record["dag_name"]]
-            roots = [n for n, d in dag.in_degree() if d == 0]
 
             for _ in range(num_invocations):
                 """Constructing flow"""
                 flow_id += 1
-                sim.state.add_flow(flow_id, dag)
-                for func in roots:
+                template = sim.state.add_flow(flow_id, dag).template
+                for root in template.roots:
                     request = Request(
                         flow_id=flow_id,
                         dag_name=record["dag_name"],
                         arrival_time=clock.now(),
                         rps=rps,
-                        dest=func,
-                        duration=dag.nodes[func]["duration_milli"],
-                        memory=dag.nodes[func]["memory_mib"],
+                        dest=template.dests[root],
+                        duration=template.durations[root],
+                        memory=template.memories[root],
                     )
                     cluster.ingress_accept(request)
                     sim.log.info(
-                        f"Invoked root function {func} of {record['dag_name']}",
+                        f"Invoked root function {request.dest} of {record['dag_name']}",
                         {"clock": clock.now()},
                     )
 
@@ -288,18 +299,20 @@ def run_dag_mode():
                 break
 
             record = next(records)
+            clock.wake(record[1]["timestamp"])
             if ts != record[1]["timestamp"]:
                 # ! Only increase the clock if the next timestamp is not the same as the current one.
-                clock.inc(1)
+                clock.tick()
         else:
-            clock.inc(1)
+            clock.tick()
 
         cluster.run()
     # > End of load generation loop.
 
+    clock.fast_forward(cluster.next_event_time)
     while not cluster.is_finished():
         cluster.run()
-        clock.inc(1)
+        clock.tick()
 
     cluster.dump()
     return
@@ -4,18 +4,53 @@ from typing import *
 if TYPE_CHECKING:
     from ..system.throttler import Throttler
     from ..system.cluster import Node
-    from ..system.instance import Instance, InstanceStatus
+    from ..system.instance import Instance
 
 from .. import simulation as sim
 from ..system.function import Request
+from ..system.instance import InstanceStatus
+
+policy_config = sim.FLAGS.config.policy
 
 
 def first_available(tracker: Throttler._Tracker_, request: Request):
-    """LB: First available"""
-    for instance in tracker.instances:
-        reserved = instance.reserve(request)
-        if reserved:
-            return True
+    """LB: First available (in the order the instances were added to the tracker)"""
+    instance = tracker.first_reservable()
+    if instance is not None:
+        return instance.reserve(request)
+    return False
+
+
+def any_available(tracker: Throttler._Tracker_, request: Request):
+    """LB: Any available (the most recently freed instance)"""
+    instance = tracker.last_reservable()
+    if instance is not None:
+        return instance.reserve(request)
+    return False
+
+
+def power_of_d(tracker: Throttler._Tracker_, request: Request):
+    """LB: Power of d choices (the least utilized node among d sampled available instances)"""
+    candidates = tracker.sample_reservable(policy_config.LB_SAMPLE_SIZE)
+    instance = min(
+        candidates,
+        key=lambda instance: sum(instance.node.get_utilizations()),
+        default=None,
+    )
+    if instance is not None:
+        return instance.reserve(request)
+    return False
+
+
+def jsq_d(tracker: Throttler._Tracker_, request: Request):
+    """LB: Join the shortest queue (the shortest runqueue, then the least utilized node)
+    among d sampled available instances"""
+    candidates = tracker.sample_reservable(policy_config.LB_SAMPLE_SIZE)
+    instance = min(
+        candidates, key=lambda instance: instance.node.get_load(), default=None
+    )
+    if instance is not None:
+        return instance.reserve(request)
     return False
 
 
@@ -26,22 +61,18 @@ def least_loaded(tracker: Throttler._Tracker_, request: Request):
     :param request: _description_
     :return: _description_
     """
-    # * First, find the least-loaded (LL) node.
-    func_nodes = set()
-    for instance in tracker.instances:
-        func_nodes.add(instance.node)
-    func_nodes: List[Node] = list(func_nodes)
+    # * First, find the least-loaded (LL) node (by runqueue length, then cpu + mem, then name).
     # TODO: Use better metrics than just cpu + mem.
-    func_nodes.sort(key=lambda node: sum(node.get_utilizations()))
-    func_nodes.sort(key=lambda node: len(node.runqueue))
-    ll_node = func_nodes[0] if func_nodes else None  # * Could be a cold start.
+    ll_node: Node = tracker.least_loaded_node()  # * Could be a cold start.
 
-    # * Then, try to get an idle instance on the LL node.
+    # * Then, try to get an idle instance on the LL node (the first one in the tracker).
     idle_instance = None
-    for instance in tracker.instances:
-        if instance.status == InstanceStatus.IDLE and instance.node == ll_node:
-            idle_instance = instance
-            break
+    if ll_node is not None:
+        idle_instance = min(
+            ll_node.get_instances(tracker.function.name, InstanceStatus.IDLE),
+            key=lambda instance: instance.tracker_seq,
+            default=None,
+        )
 
     # * Finally, try to dispatch it.
     if idle_instance:
@@ -53,12 +84,11 @@ def least_loaded(tracker: Throttler._Tracker_, request: Request):
     else:
         # * No idle instance available even on the LL node -> then every node is the same (it's gonna be cold start anyway)
         # ! No need to check instance-level queueues, because the instances all have a queue length of 1 (same as AWS).
-        for instance in tracker.instances:
-            reserved = instance.reserve(request)
-            if reserved:
-                sim.log.info(
-                    f"(loadbalance) Dispatched {request.req_id}",
-                    {"clock": sim.state.clock.now()},
-                )
-                return True
+        instance = tracker.first_reservable()
+        if instance is not None and instance.reserve(request):
+            sim.log.info(
+                f"(loadbalance) Dispatched {request.req_id}",
+                {"clock": sim.state.clock.now()},
+            )
+            return True
     return False
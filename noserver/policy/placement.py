@@ -0,0 +1,47 @@
+from __future__ import annotations
+from typing import *
+
+if TYPE_CHECKING:
+    from ..system.worker import Node
+
+from ..system.worker import WorkerType
+
+# * Placement policies map a node with `free_slots` left to its key in the placement index,
+# * where the node with the smallest key gets the next instance (cf. `Scheduler.place()`).
+
+
+def best_fit(node: Node, free_slots: int):
+    """Placement: Best fit (the node with the least free slots, cores and memory left, ≈ bin-packing)"""
+    return (
+        free_slots,
+        node.get_num_available_cores(),
+        node.memory_mib - node.memory_used,
+    )
+
+
+def worst_fit(node: Node, free_slots: int):
+    """Placement: Worst fit (the node with the most free slots, cores and memory left, ≈ spreading)"""
+    return (
+        -free_slots,
+        -node.get_num_available_cores(),
+        -(node.memory_mib - node.memory_used),
+    )
+
+
+def most_allocated(node: Node, free_slots: int):
+    """Placement: Most allocated (the node with the highest average of CPU and memory utilizations,
+    ≈ k8s `MostAllocated` scoring)"""
+    cpu_utilization, memory_usage = node.get_utilizations()
+    return (-(cpu_utilization + memory_usage) / 2, free_slots)
+
+
+def survival_aware(node: Node, free_slots: int):
+    """Placement: HarvestVM-survival-aware (regular VMs first, then the HarvestVMs most likely
+    to survive, spreading among equals)
+
+    ! The survival probability of a HarvestVM decreases with its age (cf. `HarvestVM.survival_prob()`),
+    ! so the youngest HarvestVM is the most likely to survive.
+    """
+    if node.kind == WorkerType.NormalVM:
+        return (0, 0, -free_slots)
+    return (1, -node.start_time, -free_slots)
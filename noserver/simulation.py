@@ -1,11 +1,12 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, List, Set
 
 if TYPE_CHECKING:
     from system import State
 
 import logging
 import functools
+import heapq
 import math
 import json
 import networkx as nx
@@ -42,9 +43,36 @@ flags.DEFINE_integer(
 flags.DEFINE_integer("width", 1, help="With of the DAG")
 flags.DEFINE_integer("depth", 1, help="Depth of the DAG")
 flags.DEFINE_float("rps", 1.0, help="Request per second arrival rate")
+flags.DEFINE_enum(
+    "engine",
+    "tick",
+    ["tick", "event"],
+    help="Simulation engine: visit every ms (tick) or jump between scheduled events (event)",
+)
+flags.DEFINE_boolean(
+    "fast_forward",
+    False,
+    help="Skip idle stretches of the tick engine (opposite: --nofast_forward)",
+)
 
 flags.mark_flag_as_required("mode")
 
+
+@flags.multi_flags_validator(
+    ["mode", "engine", "fast_forward"],
+    message="--fast_forward only applies to the tick engine, and neither --engine event "
+    "nor --fast_forward is supported in the rps and test modes",
+)
+def _check_engine_flags(flags_dict):
+    if flags_dict["engine"] == "event" and flags_dict["fast_forward"]:
+        # * The event engine already jumps between events.
+        return False
+    if flags_dict["mode"] in ["rps", "test"]:
+        # * Both modes drive a plain `Clock` (cf. `noserver/__main__.py`).
+        return flags_dict["engine"] == "tick" and not flags_dict["fast_forward"]
+    return True
+
+
 config_flags.DEFINE_config_file("config", default="./configs/default.py")
 
 FLAGS(sys.argv)
@@ -57,6 +85,8 @@ To override parameters:
 
 Example cmds:
     python -m noserver --mode benchmark --width 3 --depth 3 --rps 2 --invocations 1000 --config.policy.DUP_EXECUTION
+    python -m noserver --mode trace --rps 0.1 --engine event
+    python -m noserver --mode trace --rps 0.01 --fast_forward
 """
 
 ##############################################################################################
@@ -216,12 +246,83 @@ log.setLevel(logging.INFO)
 class Clock(object):
     def __init__(self):
         self.time_milli = 0
+        # * Returns the next timestamp of interest when fast-forwarding (cf. `--fast_forward`).
+        self.horizon: Callable[[], int] = None
 
     def inc(self, duration):
         self.time_milli += duration
 
+    def tick(self):
+        """Advances to the next time step (every ms is visited unless fast-forwarding)."""
+        if self.horizon is None:
+            self.inc(1)
+        else:
+            # * Nothing can happen in between -> skip the idle steps.
+            self.time_milli = max(self.time_milli + 1, self.horizon())
+
+    def fast_forward(self, horizon: Callable[[], int]):
+        """Jumps over idle steps up to `horizon()` on every tick if `--fast_forward` is set.
+
+        :param horizon: {Callable[[], int]} The next timestamp at which something may happen.
+        """
+        if FLAGS.fast_forward:
+            self.horizon = horizon
+        return
+
+    def wake(self, time_milli):
+        """Requests a visit at `time_milli` (nop as no ms is skipped)."""
+        return
+
+    def next_multiple(self, period):
+        """The first multiple of `period` after now (i.e., `now % period == 0`)."""
+        return (self.time_milli // period + 1) * period
+
     def now(self):
         return self.time_milli
 
     def __repr__(self):
         return "Clock" + repr(vars(self))
+
+
+class EventClock(Clock):
+    """Discrete-event clock jumping straight to the next scheduled wake-up.
+
+    The simulated system is still advanced by `Cluster.run()`, but only at the
+    timestamps at which its state can change (arrivals, request completions,
+    instance creations/evictions, discovery delays, periodic control loops, ...).
+    Every component registers such timestamps via `wake()`.
+    ! A superfluous wake-up is only a nop round, whereas a missing one diverges
+    ! from the tick engine -> when in doubt, wake up.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # * Min-heap of pending wake-ups (deduplicated by `self.pending`).
+        self.wakeups: List[int] = []
+        self.pending: Set[int] = set()
+
+    def tick(self):
+        while self.wakeups and self.wakeups[0] <= self.time_milli:
+            self.pending.discard(heapq.heappop(self.wakeups))
+
+        if not self.wakeups:
+            # * Nothing scheduled -> fall back to ticking.
+            self.inc(1)
+            return
+
+        self.time_milli = heapq.heappop(self.wakeups)
+        self.pending.discard(self.time_milli)
+        return
+
+    def wake(self, time_milli):
+        # * The current step is already being processed: anything due by now
+        # * (but missed in this round) is handled in the next one.
+        time_milli = max(time_milli, self.time_milli + 1)
+        if time_milli not in self.pending:
+            self.pending.add(time_milli)
+            heapq.heappush(self.wakeups, time_milli)
+        return
+
+
+def new_clock():
+    return EventClock() if FLAGS.engine == "event" else Clock()
@@ -7,6 +7,7 @@ __all__ = [
     "instance",
     "worker",
     "state",
+    "timer",
 ]
 
 from .cluster import *
@@ -17,3 +18,4 @@ from .function import *
 from .instance import *
 from .worker import *
 from .state import *
+from .timer import *
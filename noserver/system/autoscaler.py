@@ -1,10 +1,11 @@
 import math
 from typing import *
+import numpy as np
 
 from .. import simulation as sim
 from .function import *
 from .instance import *
-from .throttler import Throttler
+from .throttler import Throttler, ConcurrencyWindow, ConcurrencyMatrix
 
 
 autoscaler_config = sim.FLAGS.config.autoscaler
@@ -17,88 +18,98 @@ class Autoscaler(object):
         }
 
     def poke(self, request: Request):
-        # * Immediately start an evaluation round.
-        self.evaluate(request)
+        # * Immediately start an evaluation round for the requested function.
+        self.evaluate_function(request.dest)
         return
 
-    def evaluate(self, request: Request = None):
+    def evaluate(self):
+        for func in sim.state.throttler.trackers:
+            self.evaluate_function(func)
+        return
+
+    def evaluate_function(self, func: str):
         # TODO: When scaling to zero Replicas, the last Replica will only be removed after
         # TODO(cont.): there has not been any traffic to the Revision for the entire duration of the window.
-        def _compute_observed_cc(concurrencies, window):
-            window = min(len(concurrencies), window)
-            return sum(concurrencies[-window:]) / window
-
-        for func, tracker in sim.state.throttler.trackers.items():
-            if request is not None and request.dest != func:
-                # * Poked by the throttler -> looping until found the empty function.
-                # ! Make the search more efficient.
-                continue
-
-            tracker: Throttler._Tracker_ = tracker
-            concurrencies: List[int] = tracker.concurrencies
-            actual_scale = tracker.get_scale()
-            # * https://github.com/knative/serving/blob/main/pkg/autoscaler/scaling/autoscaler.go#L151
-            ready_pod = actual_scale if actual_scale != 0 else 1
-            cc_target: float = tracker.function.concurrency_limit
-            # * https://github.com/knative/serving/blob/main/pkg/autoscaler/scaling/autoscaler.go#L180
-            max_up_scale = math.ceil(autoscaler_config.MAX_SCALE_UP_RATE * ready_pod)
-            max_down_scale = math.floor(
-                ready_pod / autoscaler_config.MAX_SCALE_DOWN_RATE
+        tracker: Throttler._Tracker_ = sim.state.throttler.trackers[func]
+        concurrencies: ConcurrencyWindow = tracker.concurrencies
+        actual_scale = tracker.get_scale()
+        # * https://github.com/knative/serving/blob/main/pkg/autoscaler/scaling/autoscaler.go#L151
+        ready_pod = actual_scale if actual_scale != 0 else 1
+        cc_target: float = tracker.function.concurrency_limit
+        # * https://github.com/knative/serving/blob/main/pkg/autoscaler/scaling/autoscaler.go#L180
+        max_up_scale = math.ceil(autoscaler_config.MAX_SCALE_UP_RATE * ready_pod)
+        max_down_scale = math.floor(ready_pod / autoscaler_config.MAX_SCALE_DOWN_RATE)
+
+        # ! Below is uniform averaging without bucketing (alter: exponential decay).
+        # TODO: Extract policy choices.
+        panic_cc = concurrencies.mean(autoscaler_config.PANIC_WINDOW_SEC)
+        stable_cc = concurrencies.mean(autoscaler_config.STABLE_WINDOW_SEC)
+
+        is_over_panic_threshold = panic_cc / ready_pod >= (
+            autoscaler_config.PANIC_THRESHOLD_PCT / 100
+        )
+        if autoscaler_config.ALWAYS_PANIC or (panic_cc > 0 and actual_scale == 0):
+            # * Let cold function stay panic.
+            is_over_panic_threshold = True
+
+        # * Decide mode.
+        if (
+            is_over_panic_threshold
+            or len(concurrencies) < autoscaler_config.STABLE_WINDOW_SEC
+        ):
+            # sim.log.info(f"Start panicking", {'clock': sim.state.clock.now()})
+            self.scalers[func].mode = "panic"
+            desired_scale = math.ceil(panic_cc / cc_target)
+            n_requests_in_window = concurrencies.sum(autoscaler_config.PANIC_WINDOW_SEC)
+        else:
+            self.scalers[func].mode = "stable"
+            desired_scale = math.ceil(stable_cc / cc_target)
+            n_requests_in_window = concurrencies.sum(
+                autoscaler_config.STABLE_WINDOW_SEC
             )
+        # * Clamp the scale within bounds.
+        desired_scale = min(max(desired_scale, max_down_scale), max_up_scale)
 
-            # ! Below is uniform averaging without bucketing (alter: exponential decay).
-            # TODO: Extract policy choices.
-            panic_cc = _compute_observed_cc(
-                concurrencies, autoscaler_config.PANIC_WINDOW_SEC
-            )
-            stable_cc = _compute_observed_cc(
-                concurrencies, autoscaler_config.STABLE_WINDOW_SEC
-            )
+        if desired_scale == 0:
+            # * "When scaling to zero Replicas, the last Replica will only be removed after
+            # * there has not been any traffic to the Revision for the entire duration of the stable window."
+            # * https://knative.dev/docs/serving/autoscaling/kpa-specific/
+            desired_scale = 1 if n_requests_in_window > 0 else 0
 
-            is_over_panic_threshold = panic_cc / ready_pod >= (
-                autoscaler_config.PANIC_THRESHOLD_PCT / 100
-            )
-            if autoscaler_config.ALWAYS_PANIC or (panic_cc > 0 and actual_scale == 0):
-                # * Let cold function stay panic.
-                is_over_panic_threshold = True
-
-            # * Decide mode.
-            if (
-                is_over_panic_threshold
-                or len(concurrencies) < autoscaler_config.STABLE_WINDOW_SEC
-            ):
-                # sim.log.info(f"Start panicking", {'clock': sim.state.clock.now()})
-                self.scalers[func].mode = "panic"
-                desired_scale = math.ceil(panic_cc / cc_target)
-                n_requests_in_window = sum(
-                    concurrencies[-autoscaler_config.PANIC_WINDOW_SEC :]
-                )
-            else:
-                self.scalers[func].mode = "stable"
-                desired_scale = math.ceil(stable_cc / cc_target)
-                n_requests_in_window = sum(
-                    concurrencies[-autoscaler_config.STABLE_WINDOW_SEC :]
-                )
-            # * Clamp the scale within bounds.
-            desired_scale = min(max(desired_scale, max_down_scale), max_up_scale)
-
-            if desired_scale == 0:
-                # * "When scaling to zero Replicas, the last Replica will only be removed after
-                # * there has not been any traffic to the Revision for the entire duration of the stable window."
-                # * https://knative.dev/docs/serving/autoscaling/kpa-specific/
-                desired_scale = 1 if n_requests_in_window > 0 else 0
-
-            old_scale = self.scalers[func].desired_scale
-            self.scalers[func].desired_scale = desired_scale
-            self.scalers[func].actual_scale = tracker.get_scale()
-
-            if old_scale != desired_scale:
-                if old_scale == 0:
-                    sim.log.info(f"(autoscaler) Cold start upon {func}.")
-                sim.log.info(
-                    f"(autoscaler) Desired scale {func}: {old_scale} -> {desired_scale}",
-                    {"clock": sim.state.clock.now()},
-                )
+        old_scale = self.scalers[func].desired_scale
+        self.scalers[func].desired_scale = desired_scale
+        self.scalers[func].actual_scale = tracker.get_scale()
+
+        if old_scale != desired_scale:
+            self._log_scale_change(func, old_scale, desired_scale)
+        return
+
+    def get_scale_diffs(self):
+        """Yields the functions to be scaled and the differences between their desired and actual scales."""
+        trackers = sim.state.throttler.trackers
+        for func, scaler in self.scalers.items():
+            # ! Don't use the `actual_scale` from the autoscaler as it updates slower than the throttler.
+            # diff = scaler.desired_scale - scaler.actual_scale
+            diff = scaler.desired_scale - trackers[func].get_scale()
+            if diff:
+                yield func, diff
+
+    def get_total_scales(self):
+        """Total desired and actual scales of all functions seen by the autoscaler."""
+        total_desired_scale = 0
+        total_actual_scale = 0
+        for scaler in self.scalers.values():
+            total_desired_scale += scaler.desired_scale
+            total_actual_scale += scaler.actual_scale
+        return total_desired_scale, total_actual_scale
+
+    def _log_scale_change(self, func: str, old_scale: int, desired_scale: int):
+        if old_scale == 0:
+            sim.log.info(f"(autoscaler) Cold start upon {func}.")
+        sim.log.info(
+            f"(autoscaler) Desired scale {func}: {old_scale} -> {desired_scale}",
+            {"clock": sim.state.clock.now()},
+        )
         return
 
     def __repr__(self):
@@ -110,3 +121,128 @@ class Autoscaler(object):
         desired_scale: int = 0
         actual_scale: int = 0
         mode: str = "panic"
+
+
+class VectorizedAutoscaler(Autoscaler):
+    """Evaluates all functions in one batched pass over `Throttler.concurrencies`.
+
+    Gives the same desired scales as `Autoscaler` (cf. `Autoscaler.evaluate_function()`).
+    The arrays below are the single source of truth, the `_Scaler_`s are views of their rows.
+    """
+
+    def __init__(self, functions: List[Function]):
+        super().__init__(functions)
+        # ! Rows are in the order of the trackers, i.e., of the (deduplicated) `functions`.
+        functions = {function.name: function for function in functions}
+        self.funcs: List[str] = list(self.scalers)
+        self.cc_targets = np.array(
+            [functions[func].concurrency_limit for func in self.funcs], dtype=np.float64
+        )
+        self.desired_scales = np.zeros(len(self.funcs), dtype=np.int64)
+        # * Actual scales as of the last evaluation (cf. `Throttler.scales` for the live ones).
+        self.actual_scales = np.zeros(len(self.funcs), dtype=np.int64)
+        self.panicking = np.ones(len(self.funcs), dtype=bool)
+        self.scalers = {
+            func: self._Row_(self, func, row) for row, func in enumerate(self.funcs)
+        }
+
+    def evaluate(self):
+        """Evaluates all functions at once."""
+        concurrencies: ConcurrencyMatrix = sim.state.throttler.concurrencies
+        actual_scales = sim.state.throttler.scales.copy()
+        ready_pods = np.where(actual_scales != 0, actual_scales, 1)
+        max_up_scales = np.ceil(autoscaler_config.MAX_SCALE_UP_RATE * ready_pods)
+        max_down_scales = np.floor(ready_pods / autoscaler_config.MAX_SCALE_DOWN_RATE)
+
+        panic_ccs = concurrencies.means(autoscaler_config.PANIC_WINDOW_SEC)
+        stable_ccs = concurrencies.means(autoscaler_config.STABLE_WINDOW_SEC)
+
+        if autoscaler_config.ALWAYS_PANIC:
+            is_over_panic_threshold = np.ones(len(self.funcs), dtype=bool)
+        else:
+            is_over_panic_threshold = panic_ccs / ready_pods >= (
+                autoscaler_config.PANIC_THRESHOLD_PCT / 100
+            )
+            # * Let cold function stay panic.
+            is_over_panic_threshold |= (panic_ccs > 0) & (actual_scales == 0)
+
+        # * Decide modes.
+        panicking = is_over_panic_threshold | (
+            len(concurrencies) < autoscaler_config.STABLE_WINDOW_SEC
+        )
+        desired_scales = np.where(
+            panicking,
+            np.ceil(panic_ccs / self.cc_targets),
+            np.ceil(stable_ccs / self.cc_targets),
+        )
+        n_requests_in_window = np.where(
+            panicking,
+            concurrencies.sums[autoscaler_config.PANIC_WINDOW_SEC],
+            concurrencies.sums[autoscaler_config.STABLE_WINDOW_SEC],
+        )
+        # * Clamp the scales within bounds.
+        desired_scales = np.minimum(
+            np.maximum(desired_scales, max_down_scales), max_up_scales
+        ).astype(np.int64)
+        # * Keep the last Replica as long as there was traffic within the window.
+        desired_scales = np.where(
+            desired_scales == 0, n_requests_in_window > 0, desired_scales
+        ).astype(np.int64)
+
+        old_scales = self.desired_scales
+        self.desired_scales = desired_scales
+        self.actual_scales = actual_scales
+        self.panicking = panicking
+
+        for row in np.flatnonzero(desired_scales != old_scales):
+            self._log_scale_change(
+                self.funcs[row], int(old_scales[row]), int(desired_scales[row])
+            )
+        return
+
+    def get_scale_diffs(self):
+        # * Against the live scales, as in `Autoscaler.get_scale_diffs()`.
+        diffs = self.desired_scales - sim.state.throttler.scales
+        for row in np.flatnonzero(diffs):
+            yield self.funcs[row], int(diffs[row])
+
+    def get_total_scales(self):
+        return int(self.desired_scales.sum()), int(self.actual_scales.sum())
+
+    def __repr__(self):
+        return "VectorizedAutoscaler" + repr(vars(self))
+
+    class _Row_(object):
+        """A row of the arrays of the autoscaler behaving like an `Autoscaler._Scaler_`."""
+
+        def __init__(self, autoscaler: "VectorizedAutoscaler", func: str, row: int):
+            self.autoscaler = autoscaler
+            self.func = func
+            self.row = row
+
+        @property
+        def desired_scale(self):
+            return int(self.autoscaler.desired_scales[self.row])
+
+        @desired_scale.setter
+        def desired_scale(self, scale: int):
+            self.autoscaler.desired_scales[self.row] = scale
+
+        @property
+        def actual_scale(self):
+            return int(self.autoscaler.actual_scales[self.row])
+
+        @actual_scale.setter
+        def actual_scale(self, scale: int):
+            self.autoscaler.actual_scales[self.row] = scale
+
+        @property
+        def mode(self):
+            return "panic" if self.autoscaler.panicking[self.row] else "stable"
+
+        @mode.setter
+        def mode(self, mode: str):
+            self.autoscaler.panicking[self.row] = mode == "panic"
+
+        def __repr__(self):
+            return f"VectorizedAutoscaler._Row_({self.func})"
@@ -1,21 +1,24 @@
 import csv
 from typing import *
+from collections import Counter
 import networkx as nx
 import copy
 
 from .. import simulation as sim
-from .autoscaler import Autoscaler
+from .autoscaler import Autoscaler, VectorizedAutoscaler
 from .throttler import Throttler
 from .scheduler import Scheduler
 from .instance import InstanceStatus
 from .function import Function, Request
 from .worker import Node, HarvestVM, WorkerType
 from .state import State
+from .timer import TimerService, Timer
 
 
 cluster_config = sim.FLAGS.config.cluster
 policy_config = sim.FLAGS.config.policy
 hvm_config = sim.FLAGS.config.harvestvm
+autoscaler_config = sim.FLAGS.config.autoscaler
 
 # * Every 4th HVMs (9 in total).
 HVMS = [
@@ -39,14 +42,27 @@ class Cluster(object):
         functions: List[Function],
         dags: Dict[str, nx.DiGraph] = None,
     ):
+        self.timers = TimerService(clock)
+        self.node_timers: Dict[Node, Timer] = {}
+        # * Number of instances per status on the attached nodes (cf. `Node.on_status_change()`).
+        self.status_counts: Counter[InstanceStatus] = Counter()
+        # * Nodes with pending work for `run_instances()` and `reconcile()` resp.,
+        # * the others are skipped (cf. `Node.has_work()`).
+        self.active_nodes: Set[Node] = set()
+        self.reconciling_nodes: Set[Node] = set()
+        # * Index of each node in `self.nodes` for visiting the nodes above in the same order.
+        self.node_positions: Dict[Node, int] = {}
         self.nodes = nodes
+        self.scheduler = Scheduler(nodes)
         for node in self.nodes:
-            # * Inverse reference.
-            node.cluster = self
+            self.attach(node)
 
-        self.scheduler = Scheduler(nodes)
         self.throttler = Throttler(functions)
-        self.autoscaler = Autoscaler(functions)
+        self.autoscaler = (
+            VectorizedAutoscaler(functions)
+            if autoscaler_config.VECTORIZED
+            else Autoscaler(functions)
+        )
 
         # * Finished requests stats.
         self.sink = []
@@ -67,59 +83,125 @@ class Cluster(object):
         # * A Hack for initializing global simulation state to avoid circular imports :)
         sim.state = State(functions, self.autoscaler, self.throttler, clock, dags)
 
+        # * Control loops in the order they take place within a step, after the node-level ones.
+        # * Only the periodic rounds that take place regardless of the load wake up the clock,
+        # * the others are woken up by the components that have work for them.
+        control_loops = [
+            # * Invoking function instances.
+            (1, self.run_instances, False),
+            # * Dispatching queued requests.
+            (cluster_config.DISPATCH_PERIOD_MILLI, self.throttler.dispatch, False),
+            # * Serving ready requests released from workflows.
+            (1, self.accept_released, False),
+            # * Asynchronous autoscaling round.
+            (cluster_config.AUTOSCALING_PERIOD_MILLI, self.autoscaler.evaluate, True),
+            (cluster_config.SCHEDULING_PERIOD_MILLI, self.place_instances, True),
+            # * K8s control loop.
+            (cluster_config.CRI_ENGINE_PULLING_PERIOD_MILLI, self.reconcile, False),
+            (
+                cluster_config.UPDATE_CONCURRENCY_PERIOD_MILLI,
+                self.throttler.record_concurrencies,
+                True,
+            ),
+            # * Collecting cluster metrics.
+            (cluster_config.MONITORING_PERIOD_MILLI, self.monitor, True),
+        ]
+        for priority, (period, callback, wake) in enumerate(control_loops, start=1):
+            self.timers.register(period, callback, priority=priority, wake=wake)
+
+        # * Kick off the control loops (and the initial HarvestVMs).
+        clock.wake(clock.now())
+
     def run(self):
         now = sim.state.clock.now()
 
         self.maintain_hvms(now)
 
-        # self.run_cri_engines()
-
-        """Invoking function instances only if there is any to be finish."""
-        # if now in sim.state.request_end_times:
-        self.run_instances()
-
-        """Dispatching queued requests."""
-        if now % cluster_config.DISPATCH_PERIOD_MILLI == 0:
-            self.throttler.dispatch()
+        self.timers.expire(now)
+        return
 
-        """Serving ready requests released from workflows"""
-        if now % cluster_config.NETWORK_DELAY_MILLI == 0:
-            request = (
-                next(sim.state.released_requests)
-                if not sim.state.released_requests.empty()
-                else None
-            )
-            if request:
-                self.ingress_accept(request)
+    def attach(self, node: Node):
+        """Hooks up a node that joined `self.nodes`."""
+        # * Inverse reference.
+        node.cluster = self
+        node.attached = True
+        self.status_counts.update(node.status_counts)
+        # * Node-level timers go before the cluster-level control loops.
+        self.node_timers[node] = self.timers.register(
+            1000, node.reset_rate_limits, priority=0
+        )
+        self.scheduler.notify(node)
+        # * Appended to `self.nodes`.
+        self.node_positions[node] = len(self.node_positions)
+        self.active_nodes.add(node)
+        return
 
-        """Asynchronous autoscaling round."""
-        if now % cluster_config.AUTOSCALING_PERIOD_MILLI == 0:
-            self.autoscaler.evaluate()
+    def detach(self, node: Node):
+        """Removes a node from the cluster s.t. no new requests can be scheduled."""
+        self.nodes.remove(node)
+        self.timers.cancel(self.node_timers.pop(node))
+        node.attached = False
+        self.status_counts.subtract(node.status_counts)
+        self.active_nodes.discard(node)
+        self.reconciling_nodes.discard(node)
+        self._index_positions()
+        self.scheduler.forget(node)
+        return
 
-        if now % cluster_config.SCHEDULING_PERIOD_MILLI == 0:
-            self.place_instances()
+    def mark_active(self, node: Node):
+        """Makes `run_instances()` visit `node` until it runs out of work (cf. `Node.has_work()`)."""
+        self.active_nodes.add(node)
+        return
 
-        """K8s control loop."""
-        if now % cluster_config.CRI_ENGINE_PULLING_PERIOD_MILLI == 0:
-            self.reconcile()
+    def mark_reconciling(self, node: Node):
+        """Makes `reconcile()` visit `node` until its controller workqueue is empty."""
+        self.reconciling_nodes.add(node)
+        return
 
-        if now % cluster_config.UPDATE_CONCURRENCY_PERIOD_MILLI == 0:
-            self.throttler.record_concurrencies()
+    def _index_positions(self):
+        self.node_positions = {node: i for i, node in enumerate(self.nodes)}
+        return
 
-        """Collecting cluster metrics."""
-        if now % cluster_config.MONITORING_PERIOD_MILLI == 0:
-            self.monitor()
+    def _in_order(self, nodes: Set[Node]):
+        """`nodes` in the order of `self.nodes`."""
+        return sorted(nodes, key=self.node_positions.__getitem__)
+
+    def next_event_time(self):
+        """The next timestamp at which the state of the cluster may change (cf. `--fast_forward`).
+
+        ! Conservative: anything retried on every step (e.g., jobs waiting for cores,
+        ! missing HarvestVMs) pins the horizon to the next step.
+        :return: {int}
+        """
+        clock = sim.state.clock
+        now = clock.now()
+
+        if hvm_config.USE_HARVESTVM and len(self.hvms) > sum(
+            node.kind == WorkerType.HarvestVM for node in self.nodes
+        ):
+            return now + 1
+
+        # * Periodic rounds that take place regardless of the load.
+        events = [self.timers.next_wakeup(now)]
+        # * Queued requests are only retried in vain until an instance frees up.
+        if not self.throttler.breaker.empty() or self.throttler.can_dispatch():
+            events.append(clock.next_multiple(cluster_config.DISPATCH_PERIOD_MILLI))
+        if not sim.state.released_requests.empty():
+            events.append(sim.state.released_requests.first().ready_time)
+        for node in self.nodes:
+            events.append(node.next_event_time())
 
-        return
+        return max(now + 1, min(events))
 
     def run_instances(self):
         # ! The function `run()` has *side effect*, namely deleting itself from the cluster
         # ! if it's an HVM and dies. This will alter the iteratable during loop!!!
-        # ! (Must use *shallow* copy)
-        nodes = self.nodes.copy()
-        for node in nodes:
+        # ! (Must iterate over a copy)
+        for node in self._in_order(self.active_nodes):
             # & Time-consuming!
             node.run()
+            if node.attached and not node.has_work():
+                self.active_nodes.discard(node)
         return
 
     def run_cri_engines(self):
@@ -159,9 +241,8 @@ class Cluster(object):
                     hvm_hash=hvm_hash,
                     start_time=now,
                 )
-                # * Initiate the inverse pointer (a hack).
-                hvm.cluster = self
                 self.nodes.append(hvm)
+                self.attach(hvm)
 
                 # * Reset HarvestVM checkpoint.
                 self.hvm_ckps[hvm_hash] = None
@@ -175,8 +256,27 @@ class Cluster(object):
         # * Randomize order with new HVMs appended.
         if missing_hvms:
             sim.rng.shuffle(self.nodes)
+            self._index_positions()
             # ! Sync scheduler nodes after adding new nodes.
             self.scheduler.nodes = self.nodes
+            # ! Reshuffled on every step until all HarvestVMs are back.
+            sim.state.clock.wake(now + 1)
+        return
+
+    def accept_released(self):
+        """Serves the ready requests released from workflows (up to the ingress bandwidth)."""
+        clock = sim.state.clock
+        released = sim.state.released_requests
+        # * Released requests are queued in the order of their ready times.
+        for _ in range(cluster_config.INGRESS_REQUESTS_PER_MILLI):
+            request = released.first()
+            if request is None or request.ready_time > clock.now():
+                break
+            self.ingress_accept(next(released))
+
+        if not released.empty():
+            # * Either throttled by the bandwidth or not ready yet.
+            clock.wake(max(clock.now() + 1, released.first().ready_time))
         return
 
     def ingress_accept(self, request: Request):
@@ -186,56 +286,44 @@ class Cluster(object):
         return
 
     def place_instances(self):
-        for func, scaler in self.autoscaler.scalers.items():
-            # ! Don't use the `actual_scale` from the autoscaler as it updates slower than the throttler.
-            # diff = scaler.desired_scale - scaler.actual_scale
-            diff = scaler.desired_scale - self.throttler.trackers[func].get_scale()
-
-            if diff:
-                self.scheduler.schedule(func, diff)
+        for func, diff in self.autoscaler.get_scale_diffs():
+            self.scheduler.schedule(func, diff)
         return
 
     def reconcile(self):
-        for node in self.nodes:
+        for node in self._in_order(self.reconciling_nodes):
             node.reconcile()
+            if not node.controller_workqueue:
+                self.reconciling_nodes.discard(node)
+        return
 
     def is_finished(self):
-        for node in self.nodes:
-            for instance in node.instances:
-                if instance.status == InstanceStatus.RUNNING:
-                    return False
+        if self.status_counts[InstanceStatus.RUNNING] > 0:
+            return False
 
         if len(sim.state.flows.keys()) > 0:
             return False
         return True
 
     def monitor(self):
-        total_desired_scale = 0
-        total_actual_scale = 0
-        total_active_instances = 0
-        total_running_instances = 0
-        total_existing_instances = 0
-        total_terminating_instances = 0
         # total_remaining_capacity = 0
 
-        for func, scaler in self.autoscaler.scalers.items():
-            """This is Knative's view"""
-            total_desired_scale += scaler.desired_scale
-            total_actual_scale += scaler.actual_scale
+        """This is K8s's view"""
+        total_existing_instances = sum(self.status_counts.values())
+        total_running_instances = (
+            self.status_counts[InstanceStatus.RUNNING]
+            + self.status_counts[InstanceStatus.IDLE]
+        )
+        total_terminating_instances = self.status_counts[InstanceStatus.TERMINATING]
+        total_active_instances = total_existing_instances - total_terminating_instances
+
+        """This is Knative's view"""
+        total_desired_scale, total_actual_scale = self.autoscaler.get_total_scales()
 
         cpu_utilizations = []
         mem_utilizations = []
         for node in self.nodes:
             # total_remaining_capacity += node.get_num_available_slots()
-            """This is K8s's view"""
-            for instance in node.instances:
-                total_existing_instances += 1
-                if instance.status in [InstanceStatus.RUNNING, InstanceStatus.IDLE]:
-                    total_running_instances += 1
-                if instance.status != InstanceStatus.TERMINATING:
-                    total_active_instances += 1
-                if instance.status == InstanceStatus.TERMINATING:
-                    total_terminating_instances += 1
             cpu, mem = node.get_utilizations()
             cpu_utilizations.append(cpu)
             mem_utilizations.append(mem)
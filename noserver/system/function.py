@@ -1,4 +1,7 @@
 from dataclasses import dataclass
+from itertools import islice
+from typing import *
+from collections import OrderedDict
 
 from .. import simulation as sim
 
@@ -21,6 +24,8 @@ class Request(object):
     dag_name: str
 
     arrival_time: int = None
+    # * The time a request released from a workflow reaches the cluster (after the network delay).
+    ready_time: int = None
     start_time: int = None
     end_time: int = None
     # * Accumulated CPU time of this request.
@@ -45,8 +50,7 @@ class Request(object):
 
         # * Register the timestamp of the finishing event.
         # * (this time will be wrong if preemption/halting happens, but in that case, it's just a nop loop).
-        # expected_endtime = now + (self.duration-self.total_cputime)
-        # sim.state.request_end_times.append(expected_endtime)
+        sim.state.clock.wake(now + (self.duration - self.total_cputime))
         return
 
     def stop(self, node_cpu_utilization: float, node_mem_usage: float):
@@ -109,9 +113,18 @@ class Function(object):
 
 
 class Breaker(object):
+    """Bounded FIFO queue of requests.
+
+    The queue is an ordered dict keyed by the identity of the requests
+    (`Request`s are compared field by field, e.g., a replica equals its original),
+    s.t. enqueuing, popping the head and dequeuing any request are O(1).
+    ! Not a plain dict, which leaves the deleted entries at its head to be skipped
+    ! by `next(iter(...))`, i.e., draining it would be quadratic.
+    """
+
     def __init__(self, owner: str, capacity: int):
         self.owner = owner
-        self.queue = []
+        self.queue: OrderedDict[int, Request] = OrderedDict()
         self.capacity = capacity
 
     def has_slots(self):
@@ -121,14 +134,12 @@ class Breaker(object):
         return len(self.queue) == 0
 
     def first(self):
-        if len(self.queue) > 0:
-            return self.queue[0]
-        else:
-            return None
+        return next(iter(self.queue.values()), None)
 
     def rand(self):
         if len(self.queue) > 0:
-            return self.queue[sim.rng.randint(0, len(self.queue) - 1)]
+            index = sim.rng.randint(0, len(self.queue) - 1)
+            return next(islice(self.queue.values(), index, None))
         else:
             return None
 
@@ -136,28 +147,28 @@ class Breaker(object):
         # sim.log.info(f"Enqueue {request.req_id}")
 
         if len(self.queue) < self.capacity:
-            self.queue.append(request)
+            self.queue[id(request)] = request
             return True
         else:
             sim.log.fatal(f"{self.owner} Breaker overload")
             return False
 
     def dequeue(self, request: Request):
-        if request in self.queue:
-            # sim.log.info(f"Dequeue {request.req_id}")
-            self.queue.remove(request)
-        return
+        """:return: {bool} Whether `request` was queued."""
+        # sim.log.info(f"Dequeue {request.req_id}")
+        return self.queue.pop(id(request), None) is not None
 
     def __next__(self):
         if self.queue:
-            request = self.queue[0]
-            self.queue = self.queue[1:]
-            return request
+            return self.queue.popitem(last=False)[1]
         else:
             raise StopIteration
 
     def __iter__(self):
         return self
 
+    def __len__(self):
+        return len(self.queue)
+
     def __repr__(self):
         return "Breaker: " + self.owner
@@ -12,6 +12,7 @@ from .function import *
 
 
 cluster_config = sim.FLAGS.config.cluster
+node_config = sim.FLAGS.config.node
 
 
 class InstanceStatus(Enum):
@@ -30,16 +31,56 @@ class Instance(object):
         self.vcpu = vcpu
 
         self.deadline = None
-        self.hosted_job = None
+        # * Whether the instance has been spawned on its node (i.e., accounted in its memory usage).
+        self.spawned = False
+        self._hosted_job: Request = None
 
         self.start_time = sim.state.clock.now() if start_time is None else start_time
         # * Start with unkown status to be discovered.
-        self.status: InstanceStatus = InstanceStatus.IDLE
+        self._status: InstanceStatus = InstanceStatus.IDLE
+        # * Order of spawning on the node and in the tracker of `func` (set upon spawning).
+        self.spawn_seq: int = None
+        self.tracker_seq: int = None
         self.discovery_ckp = self.start_time
         """Constants"""
         self.capacity = 1  # self.concurrency_limit
         self.breaker = Breaker(f"Instance {self.func}", self.capacity)
 
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, status: InstanceStatus):
+        old_status = self._status
+        self._status = status
+        if self.spawned and status != old_status:
+            # * Keep the node's instance index in sync (cf. `Node.get_instances()`).
+            self.node.on_status_change(self, old_status, status)
+        return
+
+    @property
+    def hosted_job(self):
+        return self._hosted_job
+
+    @hosted_job.setter
+    def hosted_job(self, request: Request):
+        memory = self.memory_footprint
+        self._hosted_job = request
+        if self.spawned:
+            # * Keep the node's usage counter in sync (cf. `Node.get_utilizations()`).
+            self.node.memory_used += self.memory_footprint - memory
+            self.node.notify_load()
+        return
+
+    @property
+    def memory_footprint(self):
+        """Memory the instance takes on its node (MiB)."""
+        if self._hosted_job is not None:
+            return self._hosted_job.memory + node_config.JOB_MEMORY_OVERHEAD_MIB
+        else:
+            return node_config.INSTANCE_SIZE_MIB
+
     def serve(self, request: Request):
         """Books CPU resources for the `request`.
         :param request: Request to be serviced.
@@ -71,17 +112,32 @@ class Instance(object):
 
             self.breaker.enqueue(request)
             self.serve(request)
+            self._update_pool()
             return True
 
         elif self.status == InstanceStatus.RUNNING and self.breaker.has_slots():
             # ! Currently, this would never happen since the local queue length is 1 (only for the hosted job).
             sim.log.info(f"(instance) Reserved a slot for {request.req_id}")
             self.breaker.enqueue(request)
+            self._update_pool()
             return True
         else:
             # sim.log.info("No free slots")
             return False
 
+    def is_reservable(self):
+        """Whether `reserve()` would accept a request."""
+        return (
+            self._status in [InstanceStatus.IDLE, InstanceStatus.RUNNING]
+            and self.breaker.has_slots()
+        )
+
+    def _update_pool(self):
+        """Syncs the pool of reservable instances after the breaker changed (cf. `Node.on_status_change()`)."""
+        if self.spawned:
+            sim.state.throttler.trackers[self.func].update_pool(self)
+        return
+
     def run(self):
         """Continues the hosted job."""
         if self.hosted_job is not None:
@@ -105,6 +161,8 @@ class Instance(object):
                 > cluster_config.DISCOVERY_DELAY_MILLI
             ):
                 self.status = InstanceStatus.IDLE
+                # * Queued requests can be dispatched to this instance.
+                sim.state.throttler.wake()
 
         elif self.status == InstanceStatus.IDLE:
             # * Load the next job (None if the queue is empty).
@@ -113,6 +171,31 @@ class Instance(object):
                 self.serve(next_request)
         return
 
+    def next_event_time(self):
+        """The next timestamp at which `run()` may change the instance (cf. `Cluster.next_event_time()`)."""
+        now = sim.state.clock.now()
+        if self.hosted_job is not None:
+            request: Request = self.hosted_job
+            if not request.is_running:
+                # * Tries to book cores on every step, which only succeeds for
+                # * the first in line when there are enough free cores.
+                runqueue = self.node.runqueue
+                if (
+                    self not in runqueue
+                    or runqueue.first() is self
+                    and self.node.get_num_available_cores() >= self.vcpu
+                ):
+                    return now + 1
+                return float("inf")
+            return request.last_run_ts + request.duration - request.total_cputime
+
+        elif self.status == InstanceStatus.UNKNOWN:
+            return self.discovery_ckp + cluster_config.DISCOVERY_DELAY_MILLI + 1
+
+        elif self.status == InstanceStatus.IDLE and not self.breaker.empty():
+            return now + 1
+        return float("inf")
+
     def stop(self, preempted=False):
         self.node.yield_cores(self)
 
@@ -147,10 +230,14 @@ class Instance(object):
             # ! Set to `UNKNOWN` that models the sync delay.
             self.status = InstanceStatus.UNKNOWN
             self.discovery_ckp = sim.state.clock.now()
+            sim.state.clock.wake(
+                self.discovery_ckp + cluster_config.DISCOVERY_DELAY_MILLI + 1
+            )
         else:
             # * The newly hosted job will start in the next `run()`.
             # * (is has to book cores again.)
             self.status = InstanceStatus.RUNNING
+        self._update_pool()
         return
 
     def halt(self):
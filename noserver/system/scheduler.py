@@ -1,13 +1,101 @@
+import heapq
 from typing import *
 
 from .. import simulation as sim
 from .worker import Node
+from ..policy import placement
+
+policy_config = sim.FLAGS.config.policy
 
 
 class Scheduler(object):
     def __init__(self, nodes: List[Node]):
         self.nodes = nodes
 
+        placement_policies = {
+            # * Handled inline by `schedule()`.
+            "round_robin": None,
+            "best_fit": placement.best_fit,
+            "worst_fit": placement.worst_fit,
+            "most_allocated": placement.most_allocated,
+            "survival_aware": placement.survival_aware,
+        }
+        policy = policy_config.PLACEMENT
+        assert policy in placement_policies.keys(), f"{policy} not supported!"
+        self.placement = placement_policies[policy]
+
+        # * Min-heap of (key, name, seq, node) over the nodes with available slots.
+        # * Entries are lazily invalidated by a newer seq of the same node (or detaching).
+        self.node_heap: List[Tuple[tuple, str, int, Node]] = []
+        self.node_seqs: Dict[Node, int] = {}
+        self.num_pushes = 0
+        # * Nodes to be re-keyed before the next placement (cf. `Node.notify_load()`).
+        self.stale: Set[Node] = set()
+
+    def notify(self, node: Node):
+        """Hook for capacity changes of `node` (only tracked by the indexed placement policies)."""
+        if self.placement is not None:
+            self.stale.add(node)
+        return
+
+    def forget(self, node: Node):
+        """Hook for `node` leaving the cluster (cf. `Cluster.detach()`)."""
+        # * Invalidates any entry of the node.
+        self.node_seqs.pop(node, None)
+        self.stale.discard(node)
+        return
+
+    def place(self, func: str, num: int):
+        """Binds new function instances to the nodes picked by the placement policy one by one,
+        each pick being logarithmic in the number of nodes.
+
+        :param func: {str} Name of the function to be scheduled.
+        :param num: {int} Number of instances requested.
+        :return: {int} Remaining unscheduled quantity.
+        """
+        for node in self.stale:
+            if node.attached:
+                self._push(node, node.get_num_available_slots())
+        self.stale.clear()
+        # * Drop the invalidated entries once they outnumber the valid ones.
+        if len(self.node_heap) > 2 * len(self.node_seqs):
+            self.node_heap = [
+                entry for entry in self.node_heap if self._is_valid(entry)
+            ]
+            heapq.heapify(self.node_heap)
+
+        assigned: Dict[Node, int] = {}
+        while num > 0 and self.node_heap:
+            entry = heapq.heappop(self.node_heap)
+            if not self._is_valid(entry):
+                continue
+            node = entry[-1]
+            assigned[node] = assigned.get(node, 0) + 1
+            num -= 1
+            # * Binding doesn't change the available slots until the instances are created.
+            self._push(node, node.get_num_available_slots() - assigned[node])
+
+        for node, quantity in assigned.items():
+            # * One binding per node.
+            node.bind(func, quantity)
+            self.stale.add(node)
+        return num
+
+    def _push(self, node: Node, num_slots: int):
+        if num_slots <= 0:
+            # * Invalidates any entry of the node.
+            self.node_seqs.pop(node, None)
+            return
+        self.num_pushes += 1
+        self.node_seqs[node] = self.num_pushes
+        key = self.placement(node, num_slots)
+        heapq.heappush(self.node_heap, (key, node.name, self.num_pushes, node))
+        return
+
+    def _is_valid(self, entry: Tuple[tuple, str, int, Node]):
+        *_, seq, node = entry
+        return node.attached and self.node_seqs.get(node) == seq
+
     def schedule(self, func, num):
         """Binding new function instances to nodes.
 
@@ -15,8 +103,9 @@ class Scheduler(object):
         :param num: {int} Number of instances requested.
         :return: {int} Remaining unscheduled quantity.
         """
-        # TODO: Implement k8s bin-packing (best-fit).
-        # TODO: Extract policy choice.
+        if num > 0 and self.placement is not None:
+            return self.place(func, num)
+
         total_nodes = len(self.nodes)
         # sim.rng.shuffle(self.nodes)
         i = sim.rng.randint(0, total_nodes - 1)
@@ -28,18 +117,28 @@ class Scheduler(object):
             """
             Bind new instances to nodes
             """
-            while attempts < worst_case:
-                node = self.nodes[i % total_nodes]
-                if node.get_num_available_slots() > 0:
-                    node.bind(func, 1)
-                    num -= 1
-                if num == 0:
+            # * Round-robin over the nodes with available slots from the `i`-th node on,
+            # * i.e., every node gets an equal share and the first ones the remainder.
+            # * (binding doesn't change the available slots until the instances are created)
+            candidates = [
+                node
+                for node in (
+                    self.nodes[(i + k) % total_nodes] for k in range(total_nodes)
+                )
+                if node.get_num_available_slots() > 0
+            ]
+            if not candidates:
+                # sim.log.info(f"(scheduler) {num} unscheduled new instances", {'clock': sim.state.clock.now()})
+                return num
+
+            share, remainder = divmod(num, len(candidates))
+            for k, node in enumerate(candidates):
+                quantity = share + 1 if k < remainder else share
+                if quantity == 0:
                     break
-                attempts += 1
-                i += 1
-            # if num > 0:
-            #     sim.log.info(f"(scheduler) {num} unscheduled new instances", {'clock': sim.state.clock.now()})
-            return num
+                # * One binding per node.
+                node.bind(func, quantity)
+            return 0
         else:
             """
             Destroy instances
@@ -1,5 +1,6 @@
 import networkx as nx
 from typing import *
+from collections import Counter
 
 from .. import simulation as sim
 from .function import *
@@ -7,9 +8,48 @@ from .instance import *
 from .autoscaler import Autoscaler
 from .throttler import Throttler
 
+cluster_config = sim.FLAGS.config.cluster
 request_config = sim.FLAGS.config.request
 
 
+class DagTemplate(object):
+    """A DAG compiled into arrays indexed by node id, shared by all flows of the DAG."""
+
+    def __init__(self, dag: nx.DiGraph):
+        self.funcs: List[str] = list(dag.nodes)
+        ids = {func: i for i, func in enumerate(self.funcs)}
+        attributes = [dag.nodes[func] for func in self.funcs]
+        # * Destinations of the requests, i.e., function names (prefixed by the DAG name in trace mode).
+        self.dests: List[str] = [
+            func if sim.FLAGS.mode != "trace" else f"{attrs['dag_name']}-{func}"
+            for func, attrs in zip(self.funcs, attributes)
+        ]
+        self.ids: Dict[str, int] = {dest: i for i, dest in enumerate(self.dests)}
+
+        self.in_degrees: List[int] = [dag.in_degree(func) for func in self.funcs]
+        # * Successors in CSR form: those of node `i` are `successors[offsets[i] : offsets[i + 1]]`.
+        self.offsets: List[int] = [0]
+        self.successors: List[int] = []
+        for func in self.funcs:
+            self.successors.extend(ids[successor] for successor in dag.successors(func))
+            self.offsets.append(len(self.successors))
+        self.num_edges = len(self.successors)
+
+        self.durations: List[int] = [attrs["duration_milli"] for attrs in attributes]
+        self.memories: List[int] = [attrs["memory_mib"] for attrs in attributes]
+        self.vcpus: List[int] = [attrs.get("vcpu", 1) for attrs in attributes]
+        self.roots: List[int] = [i for i, d in enumerate(self.in_degrees) if d == 0]
+        self.leaves: List[int] = [
+            i for i in range(len(self.funcs)) if self.offsets[i] == self.offsets[i + 1]
+        ]
+
+    def get_successors(self, i: int):
+        return self.successors[self.offsets[i] : self.offsets[i + 1]]
+
+    def __repr__(self):
+        return "DagTemplate" + repr(self.funcs)
+
+
 class State(object):
     def __init__(
         self,
@@ -24,19 +64,26 @@ class State(object):
         self.throttler: Throttler = throttler
         self.clock = clock
         self.dags = dags
+        # * DAG -> its compiled template (cf. `self.compile()`).
+        self.templates: Dict[nx.DiGraph, DagTemplate] = {}
         self.rps = 0
 
         self.flows: Dict[int, State._Flow_] = {}
         self.released_requests = Breaker(owner="State", capacity=int(1e6))
-        self.finished_requests = []
-        self.failed_requests = []
 
         # * The times of request-finishing events.
         self.request_end_times = []
 
+    def compile(self, dag: nx.DiGraph):
+        """Compiles `dag` on its first flow, and reuses the template afterwards."""
+        if dag not in self.templates:
+            self.templates[dag] = DagTemplate(dag)
+        return self.templates[dag]
+
     def add_flow(self, flow_id: int, dag: nx.DiGraph):
-        self.flows[flow_id] = self._Flow_(dag)
-        return
+        flow = self._Flow_(self.compile(dag))
+        self.flows[flow_id] = flow
+        return flow
 
     def dereference(self, request: Request):
         sim.log.info(
@@ -53,46 +100,34 @@ class State(object):
             # *  they will try to use the `flow_id` of the deleted flow again.
             return
 
+        flow = self.flows[request.flow_id]
+        template = flow.template
+        node = template.ids[request.dest]
+        # * Count the finished/failed replicas of the request.
+        flow.settled[node] += 1
+
         if request.failed:
             sim.log.info(f"(state) {request.req_id} failed.")
-            # ! Do NOT mark failed requests as finished.
-            self.failed_requests.append(request.req_id)
+            # ! Do NOT release the successors of failed requests.
             # * Check if this's the last chance of execution before deleting the flow.
-            if (
-                self.failed_requests.count(request.req_id)
-                + self.finished_requests.count(request.req_id)
-                == request.num_replicas
-            ):
+            if flow.settled[node] == request.num_replicas:
                 # * Delete the flow of the failed request.
                 del self.flows[request.flow_id]
             return
-        else:
-            self.finished_requests.append(request.req_id)
 
-        # if self.finished_requests.count(request.req_id) > 1:
+        # if flow.settled[node] > 1:
         #     # * It was a redundant execution.
         #     return
-        # else:
-        #     # * Mark request as finished to prevent double deref.
-        #     self.finished_requests.append(request.req_id)
 
-        flow = self.flows[request.flow_id]
-        dag: nx.DiGraph = self.dags[request.dag_name]
-
-        # if set(flow.leaves).issubset(set(self.finished_requests)):
         # ! Do not use the below since there could be released requests still queued/in flight.
-        if sum(flow.counters.values()) == 0:
+        if flow.num_unfinished == 0:
             # * Delete completed flow for more efficient checking of finishing condition.
             del self.flows[request.flow_id]
 
-        successors = (
-            dag.successors(request.dest)
-            if sim.FLAGS.mode != "trace"
-            else dag.successors(f"F{request.dest.split('F')[1]}")
-        )
-        for successor in successors:
+        for successor in template.get_successors(node):
             # * Free a dependency counter for all the successors.
             flow.counters[successor] -= 1
+            flow.num_unfinished -= 1
 
             # * If all predecessors have finished (dereferenced), enqueue the subsequent request.
             if flow.counters[successor] == 0:
@@ -101,41 +136,46 @@ class State(object):
                         flow_id=request.flow_id,
                         dag_name=request.dag_name,
                         arrival_time=self.clock.now(),
+                        ready_time=self.clock.now()
+                        + cluster_config.NETWORK_DELAY_MILLI,
                         rps=-999,  # ! Don't know the actual rps but shouldn't matter here.
-                        dest=successor
-                        if sim.FLAGS.mode != "trace"
-                        else f"{dag.nodes[successor]['dag_name']}-{successor}",
+                        dest=template.dests[successor],
                         duration=min(
-                            dag.nodes[successor]["duration_milli"],
+                            template.durations[successor],
                             request_config.MAX_DURATION_SEC * 1000,
                         ),
-                        memory=dag.nodes[successor]["memory_mib"],
+                        memory=template.memories[successor],
                     )
                 )
+                self.clock.wake(self.clock.now() + cluster_config.NETWORK_DELAY_MILLI)
         return
 
     @dataclass(init=False)
     class _Flow_(object):
         # * Number of dependencies used for duplicated execution.
         num_dependencies: int
-        # * Counters: function -> # of unfinished predecessors,
+        # * Counters: node id -> # of unfinished predecessors,
         # * i.e., dependences that needed to finish before lauching this function.
         # * (similar to https://dl.acm.org/doi/10.1145/3503222.3507717)
-        counters: Dict[str, int]
-
-        leaves: List[str] = None
-
-        def __init__(self, dag: nx.DiGraph):
-            self.counters = {
-                func: len(list(dag.predecessors(func))) for func in dag.nodes
-            }
-            self.leaves = {x for x in dag.nodes() if dag.out_degree(x) == 0}
-            self.num_dependencies = dag.number_of_edges()
+        counters: List[int]
+        # * Running sum of `counters`, i.e., # of unfinished dependencies.
+        num_unfinished: int
+        # * Settled (finished or failed) replicas: node id -> # of replicas,
+        # * dropped together with the flow.
+        settled: Counter
+
+        template: DagTemplate = None
+
+        def __init__(self, template: DagTemplate):
+            self.template = template
+            self.counters = template.in_degrees.copy()
+            self.num_dependencies = template.num_edges
+            self.num_unfinished = template.num_edges
+            self.settled = Counter()
 
         def get_completion_rate(self):
-            num_unfinished = sum(self.counters.values())
             return (
-                (self.num_dependencies - num_unfinished) / self.num_dependencies
+                (self.num_dependencies - self.num_unfinished) / self.num_dependencies
                 if self.num_dependencies > 0
                 else 0
             )
@@ -1,29 +1,190 @@
 from typing import *
 from dataclasses import replace
+import heapq
+from collections import Counter
+import numpy as np
 
 from .. import simulation as sim
 from .function import *
 from .instance import *
 from ..policy import loadbalance
 
+if TYPE_CHECKING:
+    from .worker import Node
 
+
+cluster_config = sim.FLAGS.config.cluster
 policy_config = sim.FLAGS.config.policy
+autoscaler_config = sim.FLAGS.config.autoscaler
+
+
+class ConcurrencyWindow(object):
+    """Concurrency samples of the last `max(windows)` periods in a ring buffer,
+    with the running sum of each window (cf. `Autoscaler.evaluate()`).
+    """
+
+    def __init__(self, windows: Iterable[int]):
+        self.capacity = max(windows)
+        self.samples: List[int] = [0] * self.capacity
+        # * Window length -> sum of the latest samples within the window.
+        self.sums: Dict[int, int] = {window: 0 for window in windows}
+        # * Total number of samples ever appended.
+        self.num_samples = 0
+
+    def append(self, sample: int):
+        for window in self.sums:
+            if self.num_samples >= window:
+                # * Slide out the oldest sample of the window.
+                self.sums[window] -= self.samples[
+                    (self.num_samples - window) % self.capacity
+                ]
+            self.sums[window] += sample
+        self.samples[self.num_samples % self.capacity] = sample
+        self.num_samples += 1
+        return
+
+    def add(self, delta: int):
+        """Adds `delta` to the latest sample."""
+        self.samples[(self.num_samples - 1) % self.capacity] += delta
+        for window in self.sums:
+            self.sums[window] += delta
+        return
+
+    def last(self):
+        return self.samples[(self.num_samples - 1) % self.capacity]
+
+    def sum(self, window: int):
+        """≈ `sum(samples[-window:])`"""
+        return self.sums[window]
+
+    def mean(self, window: int):
+        """≈ `sum(samples[-window:]) / len(samples[-window:])`"""
+        return self.sums[window] / min(self.num_samples, window)
+
+    def __len__(self):
+        return self.num_samples
+
+    def __repr__(self):
+        return "ConcurrencyWindow" + repr(vars(self))
+
+
+class ConcurrencyMatrix(object):
+    """Concurrency samples of all functions (rows) over the last `max(windows)` periods
+    (columns) in a 2-D ring buffer, with the running sums of each window per row
+    (cf. `VectorizedAutoscaler`).
+    """
+
+    def __init__(self, num_rows: int, windows: Iterable[int]):
+        self.capacity = max(windows)
+        self.samples = np.zeros((num_rows, self.capacity), dtype=np.int64)
+        # * Window length -> sums of the latest samples within the window per row.
+        self.sums: Dict[int, np.ndarray] = {
+            window: np.zeros(num_rows, dtype=np.int64) for window in windows
+        }
+        # * Total number of columns ever appended.
+        self.num_samples = 0
+
+    def append(self, column: Iterable[int]):
+        """Appends the samples of all rows at once."""
+        for window, sums in self.sums.items():
+            if self.num_samples >= window:
+                sums -= self.samples[:, (self.num_samples - window) % self.capacity]
+        self.samples[:, self.num_samples % self.capacity] = column
+        for sums in self.sums.values():
+            sums += self.samples[:, self.num_samples % self.capacity]
+        self.num_samples += 1
+        return
+
+    def add(self, row: int, delta: int):
+        """Adds `delta` to the latest sample of `row`."""
+        self.samples[row, (self.num_samples - 1) % self.capacity] += delta
+        for sums in self.sums.values():
+            sums[row] += delta
+        return
+
+    def means(self, window: int):
+        return self.sums[window] / min(self.num_samples, window)
+
+    def row(self, row: int):
+        return ConcurrencyMatrix._Row_(self, row)
+
+    def __len__(self):
+        return self.num_samples
+
+    def __repr__(self):
+        return "ConcurrencyMatrix" + repr(vars(self))
+
+    class _Row_(object):
+        """A row of the matrix behaving like a `ConcurrencyWindow`,
+        except that samples are appended column by column to the matrix.
+        """
+
+        def __init__(self, matrix: "ConcurrencyMatrix", row: int):
+            self.matrix = matrix
+            self.row = row
+
+        def add(self, delta: int):
+            self.matrix.add(self.row, delta)
+            return
+
+        def last(self):
+            matrix = self.matrix
+            return int(
+                matrix.samples[self.row, (matrix.num_samples - 1) % matrix.capacity]
+            )
+
+        def sum(self, window: int):
+            return int(self.matrix.sums[window][self.row])
+
+        def mean(self, window: int):
+            return self.sum(window) / min(self.matrix.num_samples, window)
+
+        def __len__(self):
+            return self.matrix.num_samples
+
+        def __repr__(self):
+            return f"ConcurrencyMatrix._Row_({self.row})"
 
 
 class Throttler(object):
     def __init__(self, functions: List[Function]):
         # * Centralized queue.
         self.breaker = Breaker("Throttler", 10_000)
+        # * Function -> number of requests overflowed to the centralized queue.
+        self.overflowed: Counter[str] = Counter()
         # * One tracker for each function.
         self.trackers: Dict[str, Throttler._Tracker_] = {
             function.name: self._Tracker_(function) for function in functions
         }
+        for seq, tracker in enumerate(self.trackers.values()):
+            tracker.seq = seq
+        # * Trackers that may dispatch queued requests (cf. `self.mark_dirty()`): seq -> tracker.
+        self.dirty: Dict[int, Throttler._Tracker_] = {}
+        # * Concurrency samples of all the trackers (cf. `VectorizedAutoscaler`).
+        self.concurrencies: ConcurrencyMatrix = None
+        # * Actual scales of all the trackers (cf. `self.sync_scale()`).
+        self.scales: np.ndarray = None
+        if autoscaler_config.VECTORIZED:
+            self.concurrencies = ConcurrencyMatrix(
+                len(self.trackers),
+                (
+                    autoscaler_config.PANIC_WINDOW_SEC,
+                    autoscaler_config.STABLE_WINDOW_SEC,
+                ),
+            )
+            self.concurrencies.append(np.zeros(len(self.trackers), dtype=np.int64))
+            for row, tracker in enumerate(self.trackers.values()):
+                tracker.concurrencies = self.concurrencies.row(row)
+            self.scales = np.zeros(len(self.trackers), dtype=np.int64)
 
     def handle(self, request: Request):
         # * Only try the instances of the destination.
         tracker = self.trackers[request.dest]
         lb_policies = {
             "first_available": loadbalance.first_available,
+            "any_available": loadbalance.any_available,
+            "power_of_d": loadbalance.power_of_d,
+            "jsq_d": loadbalance.jsq_d,
             "least_loaded": loadbalance.least_loaded,
         }
         policy = policy_config.LOAD_BALANCE
@@ -59,9 +220,9 @@ class Throttler(object):
                 tracker.breaker.enqueue(replace(request))
         else:
             # * Overflow to the centralized queue.
-            self.breaker.enqueue(request)
+            self.overflow(request)
             if reexec:
-                self.breaker.enqueue(replace(request))
+                self.overflow(replace(request))
 
         # ! NB: update_concurrency() is not used since requests could overflow to the throttler queue.
         tracker.inc_concurrency()
@@ -83,16 +244,36 @@ class Throttler(object):
             tracker.dec_concurrency()
             if tracker_has_capacity:
                 tracker.breaker.dequeue(request)
-            else:
-                self.breaker.dequeue(request)
+            elif self.breaker.dequeue(request):
+                self.overflowed[request.dest] -= 1
         else:
             sim.log.info(
                 f"(throttler) No compute slots to dispatch; {request.req_id} queued.",
                 {"clock": sim.state.clock.now()},
             )
 
+        if tracker.can_dispatch():
+            # * E.g., the replica of a re-executed request.
+            self.mark_dirty(tracker)
+        if not tracker.breaker.empty() or not self.breaker.empty():
+            self.wake()
         return
 
+    def sync_scale(self, tracker: "Throttler._Tracker_"):
+        """Syncs `self.scales` after the status counts of `tracker` changed (cf. `Node.on_status_change()`)."""
+        if self.scales is not None:
+            self.scales[tracker.seq] = tracker.get_scale()
+        return
+
+    def mark_dirty(self, tracker: "Throttler._Tracker_"):
+        """Marks `tracker` to be dispatched in the next round, i.e., having both queued
+        requests and reservable instances."""
+        self.dirty[tracker.seq] = tracker
+        return
+
+    def can_dispatch(self):
+        return any(tracker.can_dispatch() for tracker in self.dirty.values())
+
     def dispatch(self):
         """$$$ FIFO dispatching (i.e., no priority among queued requests)."""
         # * Constantly trying to dispatch accumulated requests in both the central queue and the tracker queues.
@@ -109,31 +290,56 @@ class Throttler(object):
         #     if dispatched:
         #         self.breaker.dequeue(request)
 
-        for _, tracker in self.trackers.items():
-            # ! Loop over the `queue`s instead of the `breaker`s themselves, which are generators.
-            # ! Otherwise, the items are dequeued as been itereated through.
-            # ! Do NOT `enqueue()` them back while iterating, which causes inf loop as
-            # ! the iterator changes duration iteration.
+        # * Only the dirty trackers may dispatch, in the order of `self.trackers`.
+        # * (the others have either no queued requests or no reservable instances)
+        dirty, self.dirty = self.dirty, {}
+        dispatched = False
+        for seq in sorted(dirty):
+            tracker = dirty[seq]
+            if not tracker.can_dispatch():
+                continue
+            # * Dispatch from the head of the queue, s.t. a round costs O(#dispatched) instead of
+            # * O(queue length). No need to check other queued requests if the 1st one is not
+            # * dispatched (i.e., no reservable instances left).
             dispatched = False
-            for request in tracker.breaker.queue:
-                # request = tracker.breaker.first()
-                if request is not None:
-                    # for request in tracker.breaker.queue:
-                    # sim.log.info(f"Try to dispatch {request.req_id}", {'clock': sim.state.clock.now()})
-                    if self.handle(request):
-                        tracker.breaker.dequeue(request)
-                        dispatched = True
-                    else:
-                        # * No need to check other queued requests if the 1st one is not dispatched.
-                        continue
+            while (request := tracker.breaker.first()) is not None and self.handle(
+                request
+            ):
+                tracker.breaker.dequeue(request)
+                dispatched = True
+            if dispatched and not tracker.breaker.empty():
+                # * Skipped requests are retried in the next round.
+                self.wake()
+            if tracker.can_dispatch():
+                self.mark_dirty(tracker)
         return dispatched
 
+    def wake(self):
+        """Makes sure the next dispatching round takes place (cf. `sim.EventClock`)."""
+        clock = sim.state.clock
+        clock.wake(clock.next_multiple(cluster_config.DISPATCH_PERIOD_MILLI))
+        return
+
+    def overflow(self, request: Request):
+        """Enqueues `request` to the centralized queue."""
+        if self.breaker.enqueue(request):
+            self.overflowed[request.dest] += 1
+        return
+
     def record_concurrencies(self):
         """Update the snapshots of queue length for each function tracker."""
-        # TODO: Cut off by window length to reduce memory overhead.
+        if self.concurrencies is not None:
+            # * Snapshot all the trackers at once.
+            self.concurrencies.append(
+                [
+                    len(tracker.breaker) + self.overflowed[func]
+                    for func, tracker in self.trackers.items()
+                ]
+            )
+            return
+
         for func, tracker in self.trackers.items():
-            overflowed = self.breaker.queue.count(func)
-            tracker.update_concurrency(overflowed=overflowed)
+            tracker.update_concurrency(overflowed=self.overflowed[func])
         return
 
     def __repr__(self):
@@ -143,35 +349,149 @@ class Throttler(object):
         def __init__(self, func: Function):
             self.breaker = Breaker(f"_Tracker_::{func.name}", 10_000)
             self.function = func
+            # * Position in `Throttler.trackers`.
+            self.seq: int = None
             self.instances: List[Instance] = []
-            self.concurrencies = [0]
+            self.num_added_instances = 0
+            # * Pool of reservable instances to dispatch to: instance -> index in `self.pool_list`
+            # * (insertion-ordered), and the list for sampling.
+            self.pool: Dict[Instance, int] = {}
+            self.pool_list: List[Instance] = []
+            # * Min-heap of the pool by the order in `self.instances` (lazily cleaned up).
+            self.pool_heap: List[Tuple[int, Instance]] = []
+            self.pool_heaped: Set[Instance] = set()
+            # * Nodes hosting the instances -> number of instances.
+            self.node_counts: Counter[Node] = Counter()
+            # * Min-heap of the hosting nodes by (load, name) (lazily cleaned up).
+            self.node_heap: List[Tuple[Tuple[int, float], str, int, Node]] = []
+            self.num_node_pushes = 0
+            # * Number of instances per status (cf. `Node.on_status_change()`).
+            self.status_counts: Counter[InstanceStatus] = Counter()
+            # * Concurrency samples (a row of `Throttler.concurrencies` if vectorized).
+            self.concurrencies: ConcurrencyWindow = None
+            if not autoscaler_config.VECTORIZED:
+                self.concurrencies = ConcurrencyWindow(
+                    (
+                        autoscaler_config.PANIC_WINDOW_SEC,
+                        autoscaler_config.STABLE_WINDOW_SEC,
+                    )
+                )
+                self.concurrencies.append(0)
 
         def get_scale(self):
-            running_instances = 0
-            for instance in self.instances:
-                # * Only exclude UNKNOWN instances.
-                if instance.status in [InstanceStatus.RUNNING, InstanceStatus.IDLE]:
-                    running_instances += 1
-            return running_instances
+            # * Only exclude UNKNOWN (and TERMINATING) instances.
+            return (
+                self.status_counts[InstanceStatus.RUNNING]
+                + self.status_counts[InstanceStatus.IDLE]
+            )
+
+        def add_instance(self, instance: Instance):
+            instance.tracker_seq = self.num_added_instances
+            self.num_added_instances += 1
+            self.instances.append(instance)
+
+            self.node_counts[instance.node] += 1
+            # * The heap is only popped by the 'least_loaded' policy (cf. `Node.notify_load()`).
+            if (
+                self.node_counts[instance.node] == 1
+                and policy_config.LOAD_BALANCE == "least_loaded"
+            ):
+                self.push_node(instance.node, instance.node.get_load())
+            return
+
+        def remove_instance(self, instance: Instance):
+            self.instances.remove(instance)
+            self.node_counts[instance.node] -= 1
+            if self.node_counts[instance.node] == 0:
+                # * Lazily dropped from the heap.
+                del self.node_counts[instance.node]
+            return
+
+        def push_node(self, node: "Node", load: Tuple[int, float]):
+            if node in self.node_counts:
+                heapq.heappush(
+                    self.node_heap, (load, node.name, self.num_node_pushes, node)
+                )
+                self.num_node_pushes += 1
+            return
+
+        def least_loaded_node(self):
+            """The node with the least load (cf. `Node.get_load()`) among the ones hosting instances.
+
+            ! The heap holds an entry no greater than the current load for every hosting node
+            ! (decreased loads are pushed by `Node.notify_load()`), the others are stale.
+            """
+            while self.node_heap:
+                load, _, _, node = self.node_heap[0]
+                if node not in self.node_counts:
+                    heapq.heappop(self.node_heap)
+                    continue
+
+                current_load = node.get_load()
+                if load != current_load:
+                    heapq.heappop(self.node_heap)
+                    if load < current_load:
+                        self.push_node(node, current_load)
+                    continue
+                return node
+            return None
+
+        def update_pool(self, instance: Instance):
+            """Adds/removes `instance` to/from the pool depending on if it's reservable."""
+            if instance.spawned and instance.is_reservable():
+                if instance not in self.pool:
+                    self.pool[instance] = len(self.pool_list)
+                    self.pool_list.append(instance)
+                    if not self.breaker.empty():
+                        # * Queued requests can be dispatched to the instance.
+                        sim.state.throttler.mark_dirty(self)
+                    if instance not in self.pool_heaped:
+                        heapq.heappush(self.pool_heap, (instance.tracker_seq, instance))
+                        self.pool_heaped.add(instance)
+            elif instance in self.pool:
+                # * Swap-remove from the list.
+                index = self.pool.pop(instance)
+                last = self.pool_list.pop()
+                if last is not instance:
+                    self.pool_list[index] = last
+                    self.pool[last] = index
+            return
+
+        def first_reservable(self):
+            """The reservable instance that comes first in `self.instances`."""
+            while self.pool_heap and self.pool_heap[0][1] not in self.pool:
+                _, instance = heapq.heappop(self.pool_heap)
+                self.pool_heaped.discard(instance)
+            return self.pool_heap[0][1] if self.pool_heap else None
+
+        def last_reservable(self):
+            """The instance that became reservable most recently."""
+            return next(reversed(self.pool), None)
+
+        def sample_reservable(self, k: int):
+            """Samples (up to) `k` distinct reservable instances uniformly."""
+            return sim.rng.sample(self.pool_list, min(k, len(self.pool_list)))
+
+        def can_dispatch(self):
+            """Whether a queued request could be reserved by any instance (cf. `Instance.reserve()`)."""
+            return not self.breaker.empty() and len(self.pool) > 0
 
         def update_concurrency(self, overflowed=0):
-            # TODO: Cut the concurrency record by the window size.
-            # * (could become too large when simulating for a long time)
-            self.concurrencies.append(len(self.breaker.queue) + overflowed)
+            self.concurrencies.append(len(self.breaker) + overflowed)
             return
 
         def inc_concurrency(self):
-            self.concurrencies[-1] += 1
+            self.concurrencies.add(1)
             sim.log.info(
-                f"(throttler) Concurrency inc to {self.concurrencies[-1]}",
+                f"(throttler) Concurrency inc to {self.concurrencies.last()}",
                 {"clock": sim.state.clock.now()},
             )
             return
 
         def dec_concurrency(self):
-            self.concurrencies[-1] -= 1
+            self.concurrencies.add(-1)
             sim.log.info(
-                f"(throttler) Concurrency dec to {self.concurrencies[-1]}",
+                f"(throttler) Concurrency dec to {self.concurrencies.last()}",
                 {"clock": sim.state.clock.now()},
             )
             return
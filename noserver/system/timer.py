@@ -0,0 +1,108 @@
+import heapq
+import bisect
+from dataclasses import dataclass, field
+from typing import *
+
+from .. import simulation as sim
+
+
+@dataclass
+class Timer(object):
+    """A recurring timer firing at every multiple of its `period` (≈ `now % period == 0`)."""
+
+    period: int
+    callback: Callable[[], Any]
+    # * Timers expiring at the same time fire in the order of (priority, seq).
+    priority: int
+    seq: int
+    # * Whether the timer alone wakes up the clock (cf. `sim.EventClock`).
+    # * Otherwise, it only fires if its step is visited anyway (e.g., woken up by pending work).
+    wake: bool = False
+    due: int = None
+    cancelled: bool = field(default=False, repr=False)
+
+    def first_due(self, now: int):
+        """The first multiple of the period from `now` on (inclusive)."""
+        return -(-now // self.period) * self.period
+
+
+class TimerService(object):
+    """Recurring timers bucketed by expiry time.
+
+    Only the timers expiring at the current step are touched, the rest wait on the
+    min-heap of expiry times. A timer keeps its expiry time until a later step, s.t.
+    running the same step twice (e.g., arrivals sharing a timestamp) fires it again.
+    """
+
+    def __init__(self, clock: sim.Clock):
+        self.clock = clock
+        # * Min-heap of expiry times -> timers sorted by (priority, seq).
+        self.dues: List[int] = []
+        self.buckets: Dict[int, List[Timer]] = {}
+        self.wake_timers: List[Timer] = []
+        self.num_registered = 0
+
+    def register(
+        self, period: int, callback: Callable[[], Any], priority=0, wake=False
+    ):
+        """Registers a recurring timer.
+
+        :param period: {int} Period in milliseconds.
+        :param callback: {Callable} Invoked upon every expiry.
+        :param priority: {int} Lower fires first among timers expiring at the same time.
+        :param wake: {bool} Wakes up the clock on every expiry.
+        :return: {Timer}
+        """
+        timer = Timer(period, callback, priority, self.num_registered, wake)
+        self.num_registered += 1
+        if wake:
+            self.wake_timers.append(timer)
+        self._schedule(timer, timer.first_due(self.clock.now()))
+        return timer
+
+    def cancel(self, timer: Timer):
+        # * Lazily dropped from its bucket.
+        timer.cancelled = True
+        if timer.wake:
+            self.wake_timers.remove(timer)
+        return
+
+    def expire(self, now: int):
+        """Fires all timers expiring at `now`."""
+        # * Re-align the timers whose steps were skipped (cf. `sim.EventClock`).
+        while self.dues and self.dues[0] < now:
+            for timer in self.buckets.pop(heapq.heappop(self.dues)):
+                if not timer.cancelled:
+                    self._schedule(timer, timer.first_due(now))
+
+        # ! Copy as the callbacks may register new timers.
+        for timer in self.buckets.get(now, []).copy():
+            if timer.cancelled:
+                continue
+            timer.callback()
+            if timer.wake:
+                self.clock.wake(now + timer.period)
+        return
+
+    def next_wakeup(self, now: int):
+        """The next expiry among the timers waking up the clock (cf. `--fast_forward`)."""
+        return min(
+            (
+                timer.due if timer.due > now else timer.first_due(now + 1)
+                for timer in self.wake_timers
+            ),
+            default=float("inf"),
+        )
+
+    def _schedule(self, timer: Timer, due: int):
+        timer.due = due
+        if due not in self.buckets:
+            self.buckets[due] = []
+            heapq.heappush(self.dues, due)
+        bisect.insort(self.buckets[due], timer, key=lambda t: (t.priority, t.seq))
+        if timer.wake:
+            self.clock.wake(due)
+        return
+
+    def __repr__(self):
+        return "TimerService" + repr(vars(self))
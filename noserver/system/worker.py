@@ -1,19 +1,21 @@
 import math
+import heapq
 from dataclasses import dataclass
 from typing import *
 
 if TYPE_CHECKING:
     from .cluster import Cluster
-from collections import OrderedDict
+from collections import deque, Counter
 from enum import Enum
-import copy
 
 from .. import simulation as sim
 from .throttler import Throttler
 from .instance import Instance, InstanceStatus
 
+cluster_config = sim.FLAGS.config.cluster
 node_config = sim.FLAGS.config.node
 hvm_config = sim.FLAGS.config.harvestvm
+policy_config = sim.FLAGS.config.policy
 
 
 # HVM_SURVIVAL_MODEL_PATH = './data/harvestvm/models/survival_ecdf_app1.pkl'
@@ -37,14 +39,155 @@ class WorkerType(Enum):
 
 @dataclass
 class SchedulingBinding(object):
-    """Controller binding object (≈ K8s)"""
+    """Controller binding object (≈ K8s), coalescing the pending changes of a function."""
 
+    # * Time of the oldest pending change in the direction of `quantity`.
     sched_time: int
+    # * Time of the latest change coalesced into the binding.
     touched_time: int
     func: str
+    # * Net desired delta of instances.
     quantity: int
 
 
+class CPURegistry(object):
+    """Per-core residency of a node (≈ cpuset) with O(vcpu) booking and yielding.
+
+    Cores are indexed from 0 and booked lowest-id-first. Free cores are tracked by a
+    bitmap (bit `i` set <=> core `i` is free) and the booked ones by their residents.
+    """
+
+    def __init__(self, num_cores: int):
+        self.cores: List[Instance] = [None] * num_cores
+        self.free_mask = (1 << num_cores) - 1
+        self.num_free = num_cores
+        # * Instance -> the cores it resides on.
+        self.residences: Dict[Instance, List[int]] = {}
+
+    @property
+    def num_occupied(self):
+        return len(self.cores) - self.num_free
+
+    def get_free_core_ids(self):
+        return [core for core, instance in enumerate(self.cores) if instance is None]
+
+    def book(self, instance: Instance, num: int):
+        """Books the `num` lowest free cores for `instance`.
+
+        :param instance: {Instance}
+        :param num: {int} Number of cores.
+        :return: {bool} False if there are not enough free cores.
+        """
+        if self.num_free < num:
+            return False
+        for _ in range(num):
+            lowest = self.free_mask & -self.free_mask
+            self[lowest.bit_length() - 1] = instance
+        return True
+
+    def release(self, instance: Instance):
+        """Frees all cores `instance` resides on (if any)."""
+        for core in self.residences.get(instance, []).copy():
+            self[core] = None
+        return
+
+    def compact(self):
+        """Removes holes between cores, making free cores only at the tail."""
+        occupied = [instance for instance in self.cores if instance is not None]
+        self._reset(occupied + [None] * (len(self.cores) - len(occupied)))
+        return
+
+    def resize(self, num_cores: int):
+        """Grows (free cores) or shrinks (from the tail regardless of the residents) to `num_cores`."""
+        cores = self.cores[:num_cores]
+        self._reset(cores + [None] * (num_cores - len(cores)))
+        return
+
+    def _reset(self, cores: List[Instance]):
+        self.cores = [None] * len(cores)
+        self.free_mask = (1 << len(cores)) - 1
+        self.num_free = len(cores)
+        self.residences = {}
+        for core, instance in enumerate(cores):
+            self[core] = instance
+        return
+
+    def __getitem__(self, core: int):
+        return self.cores[core]
+
+    def __setitem__(self, core: int, instance: Instance):
+        resident = self.cores[core]
+        if resident is not None:
+            self.residences[resident].remove(core)
+            if not self.residences[resident]:
+                del self.residences[resident]
+            self.free_mask |= 1 << core
+            self.num_free += 1
+
+        self.cores[core] = instance
+        if instance is not None:
+            self.residences.setdefault(instance, []).append(core)
+            self.free_mask &= ~(1 << core)
+            self.num_free -= 1
+        return
+
+    def __len__(self):
+        return len(self.cores)
+
+    def values(self):
+        return iter(self.cores)
+
+    def items(self):
+        return enumerate(self.cores)
+
+    def __repr__(self):
+        return "CPURegistry" + repr(self.cores)
+
+
+class RunQueue(object):
+    """FIFO of instances waiting for cores with O(1) membership and head-of-line checks.
+
+    ! An instance can be queued more than once (e.g., context-switched out twice
+    ! upon a harvest shrink), hence membership is counted.
+    """
+
+    def __init__(self):
+        self.queue: Deque[Instance] = deque()
+        self.counts: Counter[Instance] = Counter()
+
+    def first(self):
+        return self.queue[0] if self.queue else None
+
+    def append(self, instance: Instance):
+        self.queue.append(instance)
+        self.counts[instance] += 1
+        return
+
+    def appendleft(self, instance: Instance):
+        self.queue.appendleft(instance)
+        self.counts[instance] += 1
+        return
+
+    def popleft(self):
+        instance = self.queue.popleft()
+        self.counts[instance] -= 1
+        if not self.counts[instance]:
+            del self.counts[instance]
+        return instance
+
+    def __contains__(self, instance: Instance):
+        return instance in self.counts
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __iter__(self):
+        return iter(self.queue)
+
+    def __repr__(self):
+        return "RunQueue" + repr(list(self.queue))
+
+
 # noinspection PyProtectedMember
 class Node(object):
     """A worker/VM running on bare-metal."""
@@ -65,10 +208,19 @@ class Node(object):
         self.memory_mib = memory_mib
         self.max_num_instances = max_num_instances
 
-        self.cpu_registry: OrderedDict[int, Instance] = OrderedDict(
-            {core: None for core in range(self.num_cores)}
-        )
+        self.cpu_registry = CPURegistry(self.num_cores)
         self.instances: List[Instance] = []
+        # * Memory taken by the (both terminating and running) instances (cf. `Instance.memory_footprint`).
+        self.memory_used = 0
+        # * Index of the instances by function and status (insertion-ordered sets).
+        self.instance_index: Dict[str, Dict[InstanceStatus, Dict[Instance, None]]] = {}
+        self.num_spawned = 0
+        # * Number of spawned instances per status (cf. `on_status_change()`).
+        self.status_counts: Counter[InstanceStatus] = Counter()
+        # * Whether the node is part of the cluster (cf. `Cluster.attach()`).
+        self.attached = False
+        # * Load at the last change (cf. `notify_load()`).
+        self.last_load: Tuple[int, float] = None
         self.creation_queue: List[Instance] = []
         self.eviction_queue: List[Instance] = []
         self.num_instances_created_sec = 0
@@ -77,9 +229,10 @@ class Node(object):
         # ! The instances in the `runqueue` is not explicitly dispatched.
         # * Instead, upon each `run() -> serve()`, all instances (either running and queued) will
         # * try to `book_cores()` for themselves, which gets them out of `runqueue` if successful.
-        self.runqueue: List[Instance] = []
+        self.runqueue = RunQueue()
         # * Spliting workqueue of k8s' controller into two:
-        self.controller_workqueue: List[SchedulingBinding] = []
+        # * Function -> binding with its net desired delta (cf. `bind()`).
+        self.controller_workqueue: Dict[str, SchedulingBinding] = {}
 
         self.base_hazard_milli = 0
         self.kind: WorkerType = WorkerType.NormalVM
@@ -97,14 +250,30 @@ class Node(object):
         return
 
     def get_utilizations(self):
-        occupancy = 0
-        for _, status in self.cpu_registry.items():
-            if status is not None:
-                occupancy += 1
+        if node_config.CHECK_UTILIZATION_COUNTERS:
+            self._check_utilization_counters()
+
+        occupancy = self.cpu_registry.num_occupied
         cpu_utilization = (
             occupancy / self.num_cores * 100 if self.num_cores > 0 else 0
         )  # * For HarvestVMs.
 
+        memory_usage = self.memory_used / self.memory_mib * 100
+        return cpu_utilization, memory_usage
+
+    def _check_utilization_counters(self):
+        """Recounts the CPU occupancy and memory usage from scratch.
+
+        :raises AssertionError: Counters out of sync.
+        """
+        occupancy = 0
+        for instance in self.cpu_registry.values():
+            if instance is not None:
+                occupancy += 1
+        assert (
+            occupancy == self.cpu_registry.num_occupied
+        ), f"{self.name}: {occupancy=} != {self.cpu_registry.num_occupied=}"
+
         memory_used = 0
         for instance in self.instances:
             # * Consider both terminating and running instances.
@@ -114,15 +283,107 @@ class Node(object):
                 )
             else:
                 memory_used += node_config.INSTANCE_SIZE_MIB
-        memory_usage = memory_used / self.memory_mib * 100
-        return cpu_utilization, memory_usage
+        assert math.isclose(
+            memory_used, self.memory_used
+        ), f"{self.name}: {memory_used=} != {self.memory_used=}"
+        return
+
+    def get_load(self):
+        """Load as seen by the least-loaded LB: (runqueue length, CPU + memory utilization)."""
+        return len(self.runqueue), sum(self.get_utilizations())
+
+    def notify_load(self):
+        """Hook for load changes, pushing decreased loads to the trackers of the hosted functions.
+        (cf. `Throttler._Tracker_.least_loaded_node()`)
+        """
+        if self.attached:
+            self.cluster.scheduler.notify(self)
+
+        if policy_config.LOAD_BALANCE != "least_loaded":
+            return
+
+        load = self.get_load()
+        if self.last_load is not None and load < self.last_load:
+            for func in self.instance_index:
+                sim.state.throttler.trackers[func].push_node(self, load)
+        self.last_load = load
+        return
+
+    def get_instances(self, func: str, status: InstanceStatus):
+        """Instances of `func` on this node that are in `status`.
+
+        :param func: {str} Name of the function.
+        :param status: {InstanceStatus}
+        :return: {Dict[Instance, None]} Ordered set of the instances (do NOT modify).
+        """
+        return self.instance_index.get(func, {}).get(status, {})
+
+    def on_status_change(
+        self, instance: Instance, old_status: InstanceStatus, status: InstanceStatus
+    ):
+        """Single hook for the status transitions of the instances on this node (cf. `Instance.status`).
+
+        Keeps the instance index and the status counts of the node, the tracker of the
+        function and the cluster in sync.
+        :param instance: {Instance}
+        :param old_status: {InstanceStatus} `None` upon spawning.
+        :param status: {InstanceStatus} `None` upon eviction.
+        """
+        tracker: Throttler._Tracker_ = sim.state.throttler.trackers[instance.func]
+        status_counts = [self.status_counts, tracker.status_counts]
+        if self.attached:
+            status_counts.append(self.cluster.status_counts)
+
+        if old_status is not None:
+            self._unindex(instance, old_status)
+            for counts in status_counts:
+                counts[old_status] -= 1
+        if status is not None:
+            self._index(instance, status)
+            for counts in status_counts:
+                counts[status] += 1
+
+        sim.state.throttler.sync_scale(tracker)
+        tracker.update_pool(instance)
+        # * Instances hosting jobs or syncing their status have work in `run()`.
+        if self.attached and status in [InstanceStatus.RUNNING, InstanceStatus.UNKNOWN]:
+            self.cluster.mark_active(self)
+        return
+
+    def has_work(self):
+        """Whether `run()` may change the node, otherwise it's skipped until it gets new work
+        (cf. `Cluster.run_instances()`).
+
+        ! Idle instances only get new work through the status transitions above.
+        """
+        return bool(
+            self.creation_queue
+            or self.eviction_queue
+            or self.status_counts[InstanceStatus.RUNNING]
+            or self.status_counts[InstanceStatus.UNKNOWN]
+        )
+
+    def _index(self, instance: Instance, status: InstanceStatus):
+        self.instance_index.setdefault(instance.func, {}).setdefault(status, {})[
+            instance
+        ] = None
+        return
+
+    def _unindex(self, instance: Instance, status: InstanceStatus):
+        statuses = self.instance_index[instance.func]
+        del statuses[status][instance]
+        # * Only keep the functions with instances on this node (cf. `notify_load()`).
+        if not statuses[status]:
+            del statuses[status]
+            if not statuses:
+                del self.instance_index[instance.func]
+        return
 
     def get_available_core_ids(self):
-        avail_cores = []
-        for core, status in self.cpu_registry.items():
-            if status is None:
-                avail_cores.append(core)
-        return avail_cores
+        return self.cpu_registry.get_free_core_ids()
+
+    def get_num_available_cores(self):
+        return self.cpu_registry.num_free
 
     def book_cores(self, instance: Instance):
         """Allocate cores for an instance to run.
@@ -132,42 +393,65 @@ class Node(object):
         """
         if instance not in self.runqueue:
             self.runqueue.append(instance)
+            self.notify_load()
 
-        rank = self.runqueue.index(instance)
         """$$$ Kernel sched: FCFS -- Only handle the booking if it's the first in the queue."""
-        if rank == 0:
-            self.runqueue.remove(instance)
+        if self.runqueue.first() is instance:
+            self.runqueue.popleft()
         else:
             return False
 
         requested_num_cores = instance.vcpu
-        avail_cores = self.get_available_core_ids()
-        if len(avail_cores) < requested_num_cores:
+        if not self.cpu_registry.book(instance, requested_num_cores):
             # * No enough available cores, put request back to the FRONT of the queue.
-            self.runqueue.insert(0, instance)
+            self.runqueue.appendleft(instance)
             return False
         else:
-            for core in avail_cores[:requested_num_cores]:
-                # * Limit the number of cores by the requested quantity.
-                self.cpu_registry[core] = instance
+            self.notify_load()
+            if self.runqueue:
+                # * The next in line may get its turn.
+                sim.state.clock.wake(sim.state.clock.now() + 1)
             return True
 
     def yield_cores(self, instance: Instance):
-        for core, residence in self.cpu_registry.items():
-            if residence == instance:
-                self.cpu_registry[core] = None
+        self.cpu_registry.release(instance)
+        self.notify_load()
+        if self.runqueue:
+            sim.state.clock.wake(sim.state.clock.now() + 1)
         return
 
     def bind(self, func, num):
-        """Add a new binding object.
+        """Add a new binding object, coalesced into the pending one of the same function.
 
         :param func: {str} Name of the function.
-        :param num: {int} Number of instances requested.
+        :param num: {int} Number of instances requested (negative for removal).
         :return: {None}
         """
-        self.controller_workqueue.append(
-            SchedulingBinding(sim.state.clock.now(), None, func, num)
-        )
+        now = sim.state.clock.now()
+        binding = self.controller_workqueue.get(func)
+        if binding is None:
+            self.controller_workqueue[func] = SchedulingBinding(now, now, func, num)
+            if self.attached:
+                self.cluster.mark_reconciling(self)
+            self.wake_controller()
+            return
+
+        quantity = binding.quantity + num
+        if quantity == 0:
+            # * Opposing changes cancel out.
+            del self.controller_workqueue[func]
+            return
+        if (quantity > 0) != (binding.quantity > 0):
+            # * The net delta flipped, i.e., it's pending since now.
+            binding.sched_time = now
+        binding.quantity = quantity
+        binding.touched_time = now
+        return
+
+    def wake_controller(self):
+        """Makes sure the next reconciliation round takes place (cf. `sim.EventClock`)."""
+        clock = sim.state.clock
+        clock.wake(clock.next_multiple(cluster_config.CRI_ENGINE_PULLING_PERIOD_MILLI))
         return
 
     def preempt(self, instances: List[Instance], context_switch=False):
@@ -200,6 +484,8 @@ class Node(object):
                 # * Kick the instance out to the `runqueue`.
                 # ? Should it be at the front or back?
                 self.runqueue.append(instance)
+                self.notify_load()
+                sim.state.clock.wake(sim.state.clock.now() + 1)
 
             if not context_switch:
                 deadline = (
@@ -232,19 +518,15 @@ class Node(object):
         :param num: {int} Number of instances to remove.
         :return: {int} Remaining function to be removed.
         """
-        total_matched_instances = 0
-
-        for instance in self.instances:
-            # ! Killing instances is currently NOT balanced across workers.
-            if instance.func == func and instance.status == InstanceStatus.IDLE:
-                total_matched_instances += 1
+        # ! Killing instances is currently NOT balanced across workers.
+        total_matched_instances = len(self.get_instances(func, InstanceStatus.IDLE))
 
         if total_matched_instances == 0:
             # * All instances of this function on this node have gone
             # * -> Clear up staled bindings.
-            for binding in self.controller_workqueue:
-                if binding.func == func and binding.quantity <= 0:
-                    self.controller_workqueue.remove(binding)
+            binding = self.controller_workqueue.get(func)
+            if binding is not None and binding.quantity <= 0:
+                del self.controller_workqueue[func]
             # sim.log.warn(f"No matching instances to delete for {func}")
             return num
 
@@ -255,14 +537,20 @@ class Node(object):
         )
         return remaining
 
+    def reset_rate_limits(self):
+        """Resets the per-second rate limits of the CRI engine (timer, cf. `Cluster.attach()`)."""
+        self.num_instances_created_sec = 0
+        self.num_instances_evicted_sec = 0
+        return
+
     def spawn(self):
         """Creates new instaces."""
         now = sim.state.clock.now()
-        if now % 1000 == 0:
-            self.num_instances_created_sec = 0
-
         rate_limit = 3
         if self.num_instances_created_sec >= rate_limit:
+            self._wake_cri(
+                self.num_instances_created_sec, self.creation_queue, "start_time"
+            )
             return
 
         n_created = 0
@@ -271,11 +559,18 @@ class Node(object):
                 n_created += 1
                 self.num_instances_created_sec += 1
 
-                self.instances.append(instance)
                 tracker: Throttler._Tracker_ = sim.state.throttler.trackers[
                     instance.func
                 ]
-                tracker.instances.append(instance)
+                self.instances.append(instance)
+                instance.spawned = True
+                instance.spawn_seq = self.num_spawned
+                self.num_spawned += 1
+                self.memory_used += instance.memory_footprint
+                # ! Only after the node's counters are in sync (cf. `get_load()`),
+                # ! but before indexing the status (cf. `Throttler._Tracker_.update_pool()`).
+                tracker.add_instance(instance)
+                self.on_status_change(instance, None, instance.status)
             else:
                 # * Instances are in time order, so the following instances won't meet the delay either.
                 break
@@ -284,6 +579,15 @@ class Node(object):
                 break
         # * Update the queue.
         self.creation_queue = self.creation_queue[n_created:]
+        if n_created > 0:
+            self.notify_load()
+
+        self._wake_cri(
+            self.num_instances_created_sec, self.creation_queue, "start_time"
+        )
+        if n_created > 0:
+            # * New instances are ready to serve queued requests.
+            sim.state.throttler.wake()
 
         # if n_created > 0:
         #     sim.log.info(f"(node) Spawned {n_created} instances on {self.name}", {'clock': now})
@@ -293,11 +597,11 @@ class Node(object):
         """Garbage-collects all expired instances."""
         # ? Maybe control concurrency here as well
         now = sim.state.clock.now()
-        if now % 1000 == 0:
-            self.num_instances_evicted_sec = 0
-
         rate_limit = 3
         if self.num_instances_evicted_sec >= rate_limit:
+            self._wake_cri(
+                self.num_instances_evicted_sec, self.eviction_queue, "deadline"
+            )
             return
 
         n_removed = 0
@@ -309,7 +613,10 @@ class Node(object):
                     instance.func
                 ]
                 self.instances.remove(instance)
-                tracker.instances.remove(instance)
+                instance.spawned = False
+                self.memory_used -= instance.memory_footprint
+                self.on_status_change(instance, instance.status, None)
+                tracker.remove_instance(instance)
             else:
                 # * Instances are in time order, so the following instances won't meet the grace period either.
                 break
@@ -318,16 +625,56 @@ class Node(object):
                 break
         # * Update the queue.
         self.eviction_queue = self.eviction_queue[n_removed:]
+        if n_removed > 0:
+            self.notify_load()
+        self._wake_cri(self.num_instances_evicted_sec, self.eviction_queue, "deadline")
 
         # if n_removed > 0:
         #     sim.log.info(f"(node) Evicted {n_removed} instances on {self.name}", {'clock': now})
         return
 
+    def _wake_cri(self, num_ops_sec, queue: List[Instance], due: str):
+        """Wakes up the CRI engine for the next creation/eviction (cf. `sim.EventClock`).
+
+        :param num_ops_sec: {int} Operations done in the current second (rate limit).
+        :param queue: {List[Instance]} Creation or eviction queue.
+        :param due: {str} Attribute of the instances holding the due time.
+        """
+        for time_milli in self._cri_due_times(num_ops_sec, queue, due):
+            sim.state.clock.wake(time_milli)
+        return
+
+    def _cri_due_times(self, num_ops_sec, queue: List[Instance], due: str):
+        """The next timestamps at which the CRI engine can make progress (cf. `_wake_cri()`)."""
+        clock = sim.state.clock
+        rate_limit = 3
+        times = []
+        if num_ops_sec > 0:
+            # * The rate limit is reset every second.
+            times.append(clock.next_multiple(1000))
+        if queue and num_ops_sec < rate_limit:
+            times.append(getattr(queue[0], due))
+        return times
+
+    def next_event_time(self):
+        """The next timestamp at which the node may change its state (cf. `Cluster.next_event_time()`)."""
+        events = [instance.next_event_time() for instance in self.instances]
+        events += self._cri_due_times(
+            self.num_instances_created_sec, self.creation_queue, "start_time"
+        )
+        events += self._cri_due_times(
+            self.num_instances_evicted_sec, self.eviction_queue, "deadline"
+        )
+        if self.controller_workqueue:
+            events.append(
+                sim.state.clock.next_multiple(
+                    cluster_config.CRI_ENGINE_PULLING_PERIOD_MILLI
+                )
+            )
+        return min(events, default=math.inf)
+
     def is_cold_start(self, func):
-        for instance in self.instances:
-            if instance.func == func and instance.status == InstanceStatus.RUNNING:
-                return False
-        return True
+        return not self.get_instances(func, InstanceStatus.RUNNING)
 
     def get_num_available_slots(self):
         # running_instances = [instance for instance in self.instances
@@ -347,7 +694,8 @@ class Node(object):
         )  # min(self.max_num_instances-len(self.instances), node_config.INSTANCE_CREATION_CONCURRENCY)
         instance_deletion_budget = 100  # node_config.INSTANCE_DELETION_CONCURRENCY
 
-        for binding in self.controller_workqueue:
+        # ! Copy as the fully reconciled bindings are dequeued during the loop.
+        for binding in list(self.controller_workqueue.values()):
             if instance_creation_budget <= 0 and instance_deletion_budget <= 0:
                 break
 
@@ -369,7 +717,7 @@ class Node(object):
                 # * Update the binding.
                 binding.quantity -= num_new_instances
                 if binding.quantity == 0:
-                    self.controller_workqueue.remove(binding)
+                    del self.controller_workqueue[binding.func]
 
                 """Add new instances to creation queue."""
                 new_instances = [
@@ -383,6 +731,8 @@ class Node(object):
                     for _ in range(num_new_instances)
                 ]
                 self.creation_queue += new_instances
+                self.cluster.mark_active(self)
+                sim.state.clock.wake(now + cri_delay)
 
             elif binding.quantity < 0 and instance_deletion_budget > 0:
                 """Taking down instances."""
@@ -391,26 +741,26 @@ class Node(object):
                 terminated_instances = []
                 deadline = now + node_config.INSTANCE_GRACE_PERIOD_SEC * 1000
 
-                for instance in self.instances:
-                    # * Terminate the requested number of idle `func` instances.
-                    if (
-                        instance.func == binding.func
-                        and instance.status == InstanceStatus.IDLE
-                    ):
-                        assert (
-                            instance.hosted_job is None
-                        ), f"{instance} hosts a job while being idle!"
-                        if len(terminated_instances) < num_to_terminate:
-                            instance.status = InstanceStatus.TERMINATING
-                            instance.deadline = deadline
-                            terminated_instances.append(instance)
-                            # sim.log.info(f"(node) Terminate {instance.func=} on {self.name}", {'clock': now})
-                        else:
-                            # * Terminated enough number of instances.
-                            break
+                # * Terminate the requested number of idle `func` instances (oldest first).
+                idle_instances = heapq.nsmallest(
+                    num_to_terminate,
+                    self.get_instances(binding.func, InstanceStatus.IDLE),
+                    key=lambda instance: instance.spawn_seq,
+                )
+                for instance in idle_instances:
+                    assert (
+                        instance.hosted_job is None
+                    ), f"{instance} hosts a job while being idle!"
+                    instance.status = InstanceStatus.TERMINATING
+                    instance.deadline = deadline
+                    terminated_instances.append(instance)
+                    # sim.log.info(f"(node) Terminate {instance.func=} on {self.name}", {'clock': now})
 
                 # * Update terminating instances.
                 self.eviction_queue += terminated_instances
+                if terminated_instances:
+                    self.cluster.mark_active(self)
+                    sim.state.clock.wake(deadline)
                 # * Update deletioin budget for this round of reconciliation.
                 instance_deletion_budget -= len(terminated_instances)
 
@@ -426,29 +776,21 @@ class Node(object):
                     # ! Add back a NEGATIVE quantity
                     binding.quantity = -remaining
                 elif remaining == 0:
-                    self.controller_workqueue.remove(
-                        binding
-                    )  # * Dequeue binding request.
+                    # * Dequeue binding request.
+                    del self.controller_workqueue[binding.func]
                 else:
                     raise RuntimeError("Terminated more instances than requested")
 
             elif binding.quantity == 0:
                 raise RuntimeError("Zero binding object")
+
+        if self.controller_workqueue:
+            self.wake_controller()
         return
 
     def _compact_cpu_registry(self):
-        """Removes holes between cpu slots, making empty entries only at the tail.
-        TODO: Could be imporved.
-        TODO: Test.
-        """
-        old_registry = copy.deepcopy(self.cpu_registry)
-        self.cpu_registry = OrderedDict({core: None for core in range(self.num_cores)})
-
-        nxt_core = 0
-        for _, instance in old_registry.items():
-            if instance is not None:
-                self.cpu_registry[nxt_core] = instance
-                nxt_core += 1
+        """Removes holes between cpu slots, making empty entries only at the tail."""
+        self.cpu_registry.compact()
         return
 
     @property
@@ -504,7 +846,9 @@ class HarvestVM(Node):
         # * Preempt all its instances.
         self.preempt(self.instances)
         # * Remove itself from the cluster s.t. no new requests can be scheduled.
-        self.cluster.nodes.remove(self)
+        self.cluster.detach(self)
+        # * The cluster starts replacing it in the next step.
+        sim.state.clock.wake(sim.state.clock.now() + 1)
         return
 
     def run(self):
@@ -536,8 +880,33 @@ class HarvestVM(Node):
             self.harvest()
             # * Update checkpoint for scheduling the next harvest.
             self.harvest_ckp = now
+
+        if not is_dead:
+            clock = sim.state.clock
+            survival_due = (
+                self.survival_pred_ckp + hvm_config.SURVIVAL_PREDICT_PERIOD_MILLI
+            )
+            # ! Also visit the step before, as in the tick engine the hosted jobs have
+            # ! run until right before a possible death (accounted CPU time).
+            clock.wake(survival_due - 1)
+            clock.wake(survival_due)
+            if hvm_config.ENABLE_HARVEST:
+                clock.wake(self.harvest_ckp + hvm_config.HARVEST_PERIOD_MILLI)
         return
 
+    def has_work(self):
+        # * Dies and harvests on its own schedule (cf. `run()`).
+        return True
+
+    def next_event_time(self):
+        survival_due = self.survival_pred_ckp + hvm_config.SURVIVAL_PREDICT_PERIOD_MILLI
+        # ! Also the step before the survival prediction, at which the hosted jobs
+        # ! account their CPU time before a possible death (cf. `run()`).
+        events = [super().next_event_time(), survival_due - 1, survival_due]
+        if hvm_config.ENABLE_HARVEST:
+            events.append(self.harvest_ckp + hvm_config.HARVEST_PERIOD_MILLI)
+        return min(events)
+
     def get_cores_schedule(self):
         hvm = (
             self.hvm_hash if self.hvm_hash else sim.rng.choice(list(cores_table.keys()))
@@ -567,13 +936,14 @@ class HarvestVM(Node):
         if diff > 0:
             sim.log.info(f"(hvm) Grow: {self.num_cores} -> {harvest_cores}")
             """Growing CPU entries."""
-            for i in range(len(self.cpu_registry), harvest_cores):
-                self.cpu_registry[i] = None
+            self.cpu_registry.resize(harvest_cores)
+            if self.runqueue:
+                sim.state.clock.wake(sim.state.clock.now() + 1)
         elif diff < 0:
             sim.log.info(f"(hvm) Shrink: {self.num_cores} -> {harvest_cores}")
             """Shrinking CPU entries."""
             num_cores_to_remove = -diff
-            num_available_cores = len(self.get_available_core_ids())
+            num_available_cores = self.get_num_available_cores()
             num_instances_to_preempt = num_cores_to_remove - num_available_cores
             instances_to_preempt = []
 
@@ -596,22 +966,17 @@ class HarvestVM(Node):
                 self.preempt(instances_to_preempt, context_switch=True)
 
             # * Remove preempted instances from CPUs.
-            for core, instance in self.cpu_registry.items():
-                if instance in instances_to_preempt:
-                    self.cpu_registry[core] = None
+            for instance in instances_to_preempt:
+                self.cpu_registry.release(instance)
             # * Move empty registries to the tail.
             self._compact_cpu_registry()
             # * Delete CPUs backword (w/o worrying about the instances
             # * on them, since they have been context-switched out).
-            new_cpu_registry = copy.deepcopy(self.cpu_registry)
-            for core in range(
-                self.num_cores - 1, self.num_cores - 1 - num_cores_to_remove, -1
-            ):
-                del new_cpu_registry[core]
-            self.cpu_registry = new_cpu_registry
+            self.cpu_registry.resize(harvest_cores)
 
         assert len(self.cpu_registry) == harvest_cores
         self.num_cores = harvest_cores
+        self.notify_load()
         return
 
     @property
@@ -2,7 +2,11 @@
 >>> pytest -v -s
 '''
 
+from collections import Counter
+
+from noserver import simulation as sim
 from noserver import system
+from noserver.policy import loadbalance, placement
     
 
 def test_compact_cpu_registry():
@@ -28,4 +32,266 @@ def test_compact_cpu_registry():
     return
 
 
+def test_cpu_registry_book_release():
+    vm = system.Node('name', 8, 0, 0)
+    registry = vm.cpu_registry
+    small = system.Instance('func0', vm, 0, vcpu=2)
+    large = system.Instance('func1', vm, 0, vcpu=4)
+
+    assert registry.book(small, small.vcpu)
+    assert registry.book(large, large.vcpu)
+    assert registry.num_free == 2
+    assert not registry.book(system.Instance('func2', vm, 0, vcpu=3), 3)
+
+    # * Freed cores are booked lowest-id-first.
+    registry.release(small)
+    assert vm.get_available_core_ids() == [0, 1, 6, 7]
+    assert registry.book(small, 3)
+    assert [registry[core] for core in range(8)] == [small] * 2 + [large] * 4 + [small, None]
+
+    registry.release(large)
+    registry.resize(4)
+    assert list(registry.values()) == [small, small, None, None]
+    assert registry.num_free == 2
+    return
+
+
+def test_concurrency_window():
+    window = system.ConcurrencyWindow((3, 5))
+    matrix = system.ConcurrencyMatrix(2, (3, 5))
+    row = matrix.row(1)
+    samples = []
+    for sample in [4, 0, 2, 7, 1, 3, 5, 0]:
+        window.append(sample)
+        matrix.append([0, sample])
+        samples.append(sample)
+        window.add(-1)
+        row.add(-1)
+        samples[-1] -= 1
+        for concurrencies in (window, row):
+            assert concurrencies.last() == samples[-1]
+            for length in (3, 5):
+                assert concurrencies.sum(length) == sum(samples[-length:])
+                assert concurrencies.mean(length) == sum(samples[-length:]) / len(samples[-length:])
+            assert len(concurrencies) == len(samples)
+        assert list(matrix.means(3)) == [0, row.mean(3)]
+    return
+
+
+def make_cluster(funcs, nodes):
+    """A cluster of `nodes` serving `funcs` (which also sets up `sim.state`)."""
+    return system.Cluster(sim.Clock(), nodes, [system.Function(name=func) for func in funcs])
+
+
+def make_request(func, flow_id=0):
+    return system.Request(
+        flow_id=flow_id, rps=0, dest=func, arrival_time=sim.state.clock.now(),
+        duration=1000, memory=170, dag_name='test',
+    )
+
+
+def spawn(node, func):
+    """Spawns an idle instance of `func` on `node` right away."""
+    instance = system.Instance(func, node, start_time=sim.state.clock.now())
+    node.creation_queue.append(instance)
+    node.reset_rate_limits()
+    node.spawn()
+    instance.status = system.InstanceStatus.IDLE
+    return instance
+
+
+def test_power_of_d_vs_jsq_d():
+    # * Node `a` is less utilized but has a longer runqueue than node `b`.
+    a, b = system.Node('a', 8, 192 * 2**10, 0), system.Node('b', 8, 192 * 2**10, 0)
+    make_cluster(['func0', 'func1'], [a, b])
+    a.runqueue.append(system.Instance('func2', a, 0))
+    assert b.cpu_registry.book(system.Instance('func2', b, 0, vcpu=4), 4)
+    trackers = sim.state.throttler.trackers
+
+    # * Power of d goes by utilization.
+    a0, b0 = spawn(a, 'func0'), spawn(b, 'func0')
+    assert trackers['func0'].pool_list == [a0, b0]
+    assert loadbalance.power_of_d(trackers['func0'], make_request('func0'))
+    assert a0.status == system.InstanceStatus.RUNNING
+    # * Swap-removed from the pool.
+    assert trackers['func0'].pool_list == [b0] and trackers['func0'].pool == {b0: 0}
+
+    # * JSQ(d) by runqueue length first.
+    a1, b1 = spawn(a, 'func1'), spawn(b, 'func1')
+    assert loadbalance.jsq_d(trackers['func1'], make_request('func1'))
+    assert b1.status == system.InstanceStatus.RUNNING
+    assert trackers['func1'].pool_list == [a1] and trackers['func1'].pool == {a1: 0}
+    return
+
+
+def test_placement_policies():
+    nodes = [system.Node(name, 8, 1024, 0, slots) for name, slots in [('a', 3), ('b', 3), ('c', 1), ('d', 8)]]
+    a, b, c, d = nodes
+    # * `c` is full.
+    c.instances.append(system.Instance('func0', c, 0))
+    bindings = Counter()
+    for node in nodes:
+        node.attached = True
+        node.bind = lambda func, num, node=node: bindings.update({node.name: num})
+
+    def scheduler(policy):
+        scheduler = system.Scheduler(nodes)
+        scheduler.placement = policy
+        for node in nodes:
+            scheduler.notify(node)
+        bindings.clear()
+        return scheduler
+
+    # * Worst fit spreads, starting from the emptiest node.
+    worst_fit = scheduler(placement.worst_fit)
+    assert worst_fit.place('func0', 1) == 0 and bindings == {'d': 1}
+    # * `d` leaves with its entry still in the heap.
+    d.attached = False
+    bindings.clear()
+    assert worst_fit.place('func0', 2) == 0 and bindings == {'a': 1, 'b': 1}
+
+    # * Best fit packs, up to the free slots (bindings don't take them until the instances are created).
+    best_fit = scheduler(placement.best_fit)
+    assert best_fit.place('func0', 2) == 0 and bindings == {'a': 2}
+    bindings.clear()
+    assert best_fit.place('func0', 10) == 4 and bindings == {'a': 3, 'b': 3}
+
+    # * Most allocated goes by utilization.
+    assert b.cpu_registry.book(system.Instance('func1', b, 0, vcpu=4), 4)
+    most_allocated = scheduler(placement.most_allocated)
+    assert most_allocated.place('func0', 1) == 0 and bindings == {'b': 1}
+    return
+
+
+def simulate(clock, fast_forward=False, num_flows=12):
+    """A small benchmark-mode run (cf. `noserver.__main__.run_benchmark_mode()`)."""
+    sim.rng.seed(42)
+    dag = sim.generate_dag('gen_dag', width=3, depth=1, duration_milli=1000, memory_mib=170)
+    functions = [system.Function(name=dest) for dest in system.DagTemplate(dag).dests]
+    nodes = [system.Node(f'node-{i}', 8, 192 * 2**10, clock.now()) for i in range(2)]
+    cluster = system.Cluster(clock, nodes, functions, {'gen_dag': dag})
+    arrival_times = sim.generate_exp_arrival_times_milli(4, num_flows) + [float('inf')]
+
+    flow_id = 0
+    if fast_forward:
+        clock.horizon = lambda: min(arrival_times[flow_id], cluster.next_event_time())
+    while flow_id < num_flows:
+        clock.wake(arrival_times[flow_id])
+        while clock.now() < arrival_times[flow_id]:
+            cluster.run()
+            clock.tick()
+        template = sim.state.add_flow(flow_id, dag).template
+        for root in template.roots:
+            cluster.ingress_accept(
+                system.Request(
+                    flow_id=flow_id,
+                    rps=4,
+                    dest=template.dests[root],
+                    duration=template.durations[root],
+                    memory=template.memories[root],
+                    dag_name='gen_dag',
+                    arrival_time=clock.now(),
+                )
+            )
+        flow_id += 1
+    while not cluster.is_finished():
+        cluster.run()
+        clock.tick()
+    return cluster.sink, cluster.trace
+
+
+def test_engines():
+    sink, trace = simulate(sim.Clock())
+    assert len(sink) == 12 * 5
+    # * Both the event engine and fast-forwarding only skip the steps where nothing can happen.
+    assert simulate(sim.EventClock()) == (sink, trace)
+    assert simulate(sim.Clock(), fast_forward=True) == (sink, trace)
+    return
+
+
+def test_overflowed_requests():
+    node = system.Node('a', 8, 192 * 2**10, 0)
+    make_cluster(['func0', 'func1'], [node])
+    throttler = sim.state.throttler
+    for tracker in throttler.trackers.values():
+        # * Requests overflow to the central queue from the 2nd one on.
+        tracker.breaker.capacity = 1
+
+    for flow_id in range(3):
+        throttler.hit(make_request('func0', flow_id))
+    for flow_id in range(4):
+        throttler.hit(make_request('func1', flow_id))
+    # * An overflowed request dispatched right away leaves the central queue.
+    spawn(node, 'func1')
+    throttler.hit(make_request('func1', 4))
+
+    queued = Counter(request.dest for request in throttler.breaker.queue.values())
+    assert throttler.overflowed == queued == {'func0': 2, 'func1': 3}
+    throttler.record_concurrencies()
+    for func, tracker in throttler.trackers.items():
+        assert tracker.concurrencies.last() == len(tracker.breaker) + queued[func]
+    return
+
+
+def test_coalesced_bindings():
+    node = system.Node('a', 8, 192 * 2**10, 0)
+    clock = make_cluster(['func0'], [node]).timers.clock
+    queue = node.controller_workqueue
+
+    # * Opposing changes cancel out.
+    node.bind('func0', 2)
+    node.bind('func0', -2)
+    assert queue == {}
+
+    node.bind('func0', 2)
+    clock.inc(1)
+    node.bind('func0', -1)
+    assert (queue['func0'].quantity, queue['func0'].sched_time, queue['func0'].touched_time) == (1, 0, 1)
+    # * Flipping the sign makes the change pending since now.
+    clock.inc(1)
+    node.bind('func0', -3)
+    clock.inc(1)
+    node.bind('func0', -1)
+    assert (queue['func0'].quantity, queue['func0'].sched_time, queue['func0'].touched_time) == (-3, 2, 3)
+
+    # * No instances left to kill -> the pending removal is stale.
+    assert node.kill('func0', 1) == 1
+    assert queue == {}
+    return
+
+
+def test_active_nodes():
+    node = system.Node('a', 8, 192 * 2**10, 0)
+    cluster = make_cluster(['func0'], [node])
+    clock = cluster.timers.clock
+    # * Nodes start active until they turn out to have no work.
+    assert node in cluster.active_nodes
+    cluster.run_instances()
+    assert node not in cluster.active_nodes and node not in cluster.reconciling_nodes
 
+    # * A new binding is reconciled into an instance creation.
+    node.bind('func0', 1)
+    assert node in cluster.reconciling_nodes
+    cluster.reconcile()
+    assert node not in cluster.reconciling_nodes and node in cluster.active_nodes
+
+    # * Active until the instance is created (idle instances have no work).
+    instance = node.creation_queue[0]
+    while node.creation_queue:
+        assert node in cluster.active_nodes
+        clock.inc(1)
+        cluster.run_instances()
+    assert instance.spawned and node not in cluster.active_nodes
+
+    # * Back on hosting a job, until it is done and the instance is rediscovered (UNKNOWN -> IDLE).
+    sim.state.throttler.hit(make_request('func0'))
+    assert instance.status == system.InstanceStatus.RUNNING
+    statuses = set()
+    while instance.status != system.InstanceStatus.IDLE:
+        assert node in cluster.active_nodes
+        statuses.add(instance.status)
+        clock.inc(1)
+        cluster.run_instances()
+    assert statuses == {system.InstanceStatus.RUNNING, system.InstanceStatus.UNKNOWN}
+    assert node not in cluster.active_nodes
+    return